@@ -0,0 +1,206 @@
+import os
+import sys
+import math
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.finder import get_registry
+from src.schema_validator import validate_game_schema
+from src.sampler import OutcomeSampler, Tilt
+from src.play import play_session, play_simulation
+from src.vectorized import play_session_batch, play_simulation_batch, SAMPLING_MODES, STOP_LOSS
+from src.solver import solve_session, solve_simulation
+from src.variance import mean_estimate, compare_sessions
+from src.rng import make_rng, spawn_rng
+
+GAMES_DIR = os.path.join(ROOT, 'config', 'games')
+SESSIONS_DIR = os.path.join(ROOT, 'benchmarks', 'config', 'sessions')
+SIMULATIONS_DIR = os.path.join(ROOT, 'benchmarks', 'config', 'simulations')
+
+# sessions the solver handles in well under a second: fixed and percent bet
+# sizes, every kind of stop condition
+SESSION_CASES = ('Bench Baccarat Banker', 'Bench Craps', 'Bench Roulette')
+
+# (simulations dir, sessions dir, simulation name)
+SIMULATION_CASES = (
+    (SIMULATIONS_DIR, SESSIONS_DIR, 'Bench Baccarat Banker'),
+    (os.path.join(ROOT, 'config', 'simulations'), os.path.join(ROOT, 'config', 'sessions'), 'Month Baccarat'),
+)
+
+# proposal of the rare-event checks: losing outcomes twice as likely
+TILT = Tilt(ruin=2.0)
+
+BANKROLL = 1000.0
+
+
+def _linear_draw(possible_results: list, sorteio: float) -> int:
+    """The outcome walk play_game did before samplers: the reference for OutcomeSampler.draw."""
+    acumulated = 0
+    for index, result in enumerate(possible_results):
+        if sorteio <= acumulated + result['chance']:
+            return index
+        acumulated += result['chance']
+    return len(possible_results)
+
+
+def _outcome_tables():
+    """(case name, possible-results) of every game and bet type of GAMES_DIR."""
+    registry = get_registry(GAMES_DIR, validate_game_schema)
+    for name in registry.names():
+        game = registry.get(name)
+        if game['multi-bet-type']:
+            for bet_type, table in game['bet-types'].items():
+                yield f"{name}/{bet_type}", table['possible-results']
+        else:
+            yield name, game['possible-results']
+
+
+def check_sampler(draws: int, seed) -> list:
+    """
+    Compares OutcomeSampler.draw with the linear walk, on random draws and
+    on every cumulative threshold and its two neighbouring floats.
+    """
+    rng = make_rng(seed)
+    results = []
+    for case, possible_results in _outcome_tables():
+        sampler = OutcomeSampler(possible_results)
+        sorteios = [rng.random() for _ in range(draws)] + [0.0]
+        for threshold in sampler.cumulative:
+            sorteios += [math.nextafter(threshold, 0.0), threshold, math.nextafter(threshold, 1.0)]
+
+        mismatches = sum(1 for u in sorteios if sampler.draw(u) != _linear_draw(possible_results, u))
+        results.append({
+            'check': 'sampler', 'case': case, 'statistic': 'mismatches',
+            'exact': 0.0, 'estimate': float(mismatches), 'se': 0.0, 'ok': mismatches == 0,
+        })
+    return results
+
+
+def _compare(check: str, case: str, statistic: str, exact: float, estimate: dict, z: float) -> dict:
+    """Passes when the estimate is within z standard errors of the exact value."""
+    error = abs(estimate['estimate'] - exact)
+    return {
+        'check': check, 'case': case, 'statistic': statistic,
+        'exact': exact, 'estimate': estimate['estimate'], 'se': estimate['se'],
+        'ok': bool(error <= z * estimate['se'] + 1e-9 * max(1.0, abs(exact))),
+    }
+
+
+def check_session(session: str, runs: int, seed, z: float) -> list:
+    """Scalar, antithetic, vectorized and tilted estimates of a session against the solver."""
+    exact = solve_session(SESSIONS_DIR, GAMES_DIR, session, BANKROLL)
+    results = []
+
+    def compare(check, bankrolls, bets, stop_loss, sampling='plain'):
+        results.append(_compare(check, session, 'mean-bankroll', exact['expected-bankroll'],
+                                mean_estimate(bankrolls, sampling), z))
+        results.append(_compare(check, session, 'mean-bets', exact['expected-bets'],
+                                mean_estimate(bets, sampling), z))
+        results.append(_compare(check, session, 'stop-loss', exact['stop-reasons'].get('stop-loss', 0.0),
+                                mean_estimate(stop_loss, sampling), z))
+
+    summaries = [play_session(SESSIONS_DIR, GAMES_DIR, session, BANKROLL, spawn_rng(seed, i), 'none') for i in range(runs)]
+    compare('scalar', [s['bankroll'] for s in summaries], [s['bets'] for s in summaries],
+            [s['stop-reason'] == 'stop-loss' for s in summaries])
+
+    paired = compare_sessions(SESSIONS_DIR, GAMES_DIR, session, session, BANKROLL, runs, seed, antithetic=True)
+    profit = paired['mean-profit']['a']
+    results.append(_compare('scalar-antithetic', session, 'mean-bankroll', exact['expected-bankroll'],
+                            dict(profit, estimate=profit['estimate'] + BANKROLL), z))
+    results.append(_compare('scalar-antithetic', session, 'mean-bets', exact['expected-bets'],
+                            paired['mean-bets']['a'], z))
+
+    for sampling in SAMPLING_MODES:
+        batch = play_session_batch(SESSIONS_DIR, GAMES_DIR, session, BANKROLL, runs, seed, sampling)
+        compare(f'vectorized-{sampling}', batch['bankroll'], batch['bets'], batch['stop-reason'] == STOP_LOSS, sampling)
+
+    # weighted by the likelihood ratio, tilted runs estimate the untilted means
+    tilted = [play_session(SESSIONS_DIR, GAMES_DIR, session, BANKROLL, spawn_rng(seed, i), 'none', TILT) for i in range(runs)]
+    weights = np.array([s['weight'] for s in tilted])
+    compare('tilted', weights * [s['bankroll'] for s in tilted], weights * [s['bets'] for s in tilted],
+            weights * [s['stop-reason'] == 'stop-loss' for s in tilted])
+    return results
+
+
+def check_simulation(simulations_dir: str, sessions_dir: str, simulation: str, runs: int, seed, z: float) -> list:
+    """Scalar and vectorized estimates of a simulation against the solver."""
+    exact = solve_simulation(simulations_dir, sessions_dir, GAMES_DIR, simulation)
+    results = []
+
+    def compare(check, bankrolls, bets, sampling='plain'):
+        results.append(_compare(check, simulation, 'mean-bankroll', exact['expected-bankroll'],
+                                mean_estimate(bankrolls, sampling), z))
+        results.append(_compare(check, simulation, 'mean-bets', exact['expected-bets'],
+                                mean_estimate(bets, sampling), z))
+
+    summaries = [
+        play_simulation(simulations_dir, sessions_dir, GAMES_DIR, simulation, spawn_rng(seed, i), 'none')
+        for i in range(runs)
+    ]
+    compare('scalar', [s['bankroll'] for s in summaries], [s['bets'] for s in summaries])
+
+    for sampling in SAMPLING_MODES:
+        batch = play_simulation_batch(simulations_dir, sessions_dir, GAMES_DIR, simulation, runs, seed, sampling)
+        compare(f'vectorized-{sampling}', batch['bankroll'], batch['bets'], sampling)
+    return results
+
+
+def run_checks(runs: int = 4000, seed=0, z: float = 4.0, draws: int = 10000) -> list:
+    """
+    Runs every equivalence check on a fixed seed.
+
+    The sampler must match the linear walk exactly. The other engines are
+    Monte Carlo estimates of what the solver computes exactly, so each must
+    land within z standard errors of it; with a fixed seed the outcome is
+    the same on every run, and a change that breaks equivalence moves the
+    estimate many errors away.
+
+    Args:
+        runs: Runs per Monte Carlo estimate (even, for antithetic sampling)
+        seed: Seed of every estimate
+        z: Allowed distance to the exact value, in standard errors
+        draws: Random draws per outcome table in the sampler check
+    """
+    results = []
+
+    def record(checked):
+        for result in checked:
+            results.append(result)
+            status = 'ok' if result['ok'] else 'FAIL'
+            print(f"{result['check']:<22} {result['case']:<32} {result['statistic']:<14} "
+                  f"exact={result['exact']:,.4f} estimate={result['estimate']:,.4f} "
+                  f"se={result['se']:,.4f} {status}", flush=True)
+
+    record(check_sampler(draws, seed))
+    for session in SESSION_CASES:
+        record(check_session(session, runs, seed, z))
+    for simulations_dir, sessions_dir, simulation in SIMULATION_CASES:
+        record(check_simulation(simulations_dir, sessions_dir, simulation, runs, seed, z))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Checks that every engine agrees with the exact solver.")
+    parser.add_argument('--runs', type=int, default=4000, help="runs per Monte Carlo estimate")
+    parser.add_argument('--seed', type=int, default=0, help="seed of every estimate")
+    parser.add_argument('--z', type=float, default=4.0, help="allowed distance in standard errors")
+    parser.add_argument('--draws', type=int, default=10000, help="random draws per outcome table")
+    args = parser.parse_args(argv)
+
+    if args.runs < 2 or args.runs % 2:
+        parser.error("--runs must be even and at least 2")
+
+    results = run_checks(args.runs, args.seed, args.z, args.draws)
+    failures = [result for result in results if not result['ok']]
+    if failures:
+        print(f"{len(failures)} of {len(results)} checks failed")
+        return 1
+    print(f"All {len(results)} checks passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.finder import find_game_by_name, clear_registries
+from src.schema_validator import validate_game_schema
+from src.play import play_game, play_session, play_simulation
+from src.rng import make_rng, spawn_rng
+
+GAMES_DIR = os.path.join(ROOT, 'config', 'games')
+SESSIONS_DIR = os.path.join(ROOT, 'benchmarks', 'config', 'sessions')
+SIMULATIONS_DIR = os.path.join(ROOT, 'benchmarks', 'config', 'simulations')
+
+# (case name, game, bet type, session and simulation name)
+CASES = [
+    ('baccarat-banker', 'Baccarat', 'banker', 'Bench Baccarat Banker'),
+    ('mtt', 'Multi-Table Tournament', None, 'Bench MTT'),
+    ('craps', 'Craps', 'pass-line', 'Bench Craps'),
+    ('slots', 'Slots', None, 'Bench Slots'),
+    ('roulette', 'Roulette', 'red', 'Bench Roulette'),
+]
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+
+# higher is better for these metrics, lower for every other one
+THROUGHPUT_METRICS = ('calls-per-sec', 'bets-per-sec', 'sessions-per-sec', 'runs-per-sec')
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_lookup(iterations: int) -> dict:
+    names = [name for _, name, _, _ in CASES]
+
+    clear_registries()
+    start = time.perf_counter()
+    find_game_by_name(GAMES_DIR, names[0])
+    cold = time.perf_counter() - start
+
+    def lookups():
+        for i in range(iterations):
+            find_game_by_name(GAMES_DIR, names[i % len(names)])
+
+    return {'calls-per-sec': iterations / _best_of(3, lookups), 'cold-load-sec': cold}
+
+
+def bench_validation(iterations: int) -> dict:
+    games = [find_game_by_name(GAMES_DIR, name) for _, name, _, _ in CASES]
+
+    def validations():
+        for i in range(iterations):
+            validate_game_schema(games[i % len(games)])
+
+    return {'calls-per-sec': iterations / _best_of(3, validations)}
+
+
+def bench_play_game(game: str, bet_type: str, iterations: int) -> dict:
+    rng = make_rng(0)
+
+    def bets():
+        for _ in range(iterations):
+            play_game(GAMES_DIR, game, bet_type, 10, rng)
+
+    return {'bets-per-sec': iterations / _best_of(3, bets)}
+
+
+def bench_play_session(session: str, iterations: int) -> dict:
+    rng = make_rng(0)
+    counted = []
+
+    def sessions():
+        counted.clear()
+        for _ in range(iterations):
+            counted.append(len(play_session(SESSIONS_DIR, GAMES_DIR, session, 1000, rng)))
+
+    elapsed = _best_of(3, sessions)
+    bets = sum(counted)
+
+    # blocks still allocated per recorded bet, with every result kept alive
+    before = sys.getallocatedblocks()
+    kept = [play_session(SESSIONS_DIR, GAMES_DIR, session, 1000, rng) for _ in range(iterations)]
+    blocks = sys.getallocatedblocks() - before
+    kept_bets = sum(len(result) for result in kept)
+
+    return {
+        'sessions-per-sec': iterations / elapsed,
+        'bets-per-sec': bets / elapsed,
+        'allocations-per-bet': blocks / kept_bets if kept_bets else 0.0,
+    }
+
+
+def _simulation_batch(task: tuple) -> dict:
+    """Runs in a fresh process, so ru_maxrss is the peak of this batch alone."""
+    simulation, runs, trace = task
+    bets = 0
+    start = time.perf_counter()
+    for i in range(runs):
+        summary = play_simulation(SIMULATIONS_DIR, SESSIONS_DIR, GAMES_DIR, simulation, spawn_rng(0, i), trace)
+        bets += summary['bets']
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return {'runs-per-sec': runs / elapsed, 'bets-per-sec': bets / elapsed, 'peak-rss-bytes': peak}
+
+
+def bench_simulation_batch(simulation: str, runs: int) -> dict:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_simulation_batch, (simulation, runs, 'none')).result()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, iterations: int = 10000, cases: list = None) -> dict:
+    """
+    Runs every benchmark and returns the machine-readable report.
+
+    Args:
+        sizes: Run counts of the play_simulation batches
+        iterations: Calls per micro-benchmark (lookups, validations, bets, sessions)
+        cases: Case names to run (default: all of CASES)
+    """
+    selected = [case for case in CASES if cases is None or case[0] in cases]
+    results = []
+
+    def record(name, case, metrics):
+        results.append({'benchmark': name, 'case': case, 'metrics': metrics})
+        shown = ', '.join(f"{key}={value:,.2f}" for key, value in metrics.items())
+        print(f"{name:<20} {case or '-':<18} {shown}", flush=True)
+
+    record('find_game_by_name', None, bench_lookup(iterations))
+    record('validate_game_schema', None, bench_validation(iterations))
+
+    for case, game, bet_type, session in selected:
+        record('play_game', case, bench_play_game(game, bet_type, iterations))
+    for case, game, bet_type, session in selected:
+        record('play_session', case, bench_play_session(session, max(1, iterations // 10)))
+    for runs in sizes:
+        for case, game, bet_type, session in selected:
+            record(f'play_simulation-{runs}', case, bench_simulation_batch(session, runs))
+
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.10) -> list:
+    """
+    Lists the metrics of 'current' that are worse than 'baseline' by more than 'tolerance'.
+
+    Returns:
+        List of (benchmark, case, metric, baseline value, current value)
+    """
+    previous = {
+        (result['benchmark'], result['case'], metric): value
+        for result in baseline['results'] for metric, value in result['metrics'].items()
+    }
+
+    regressions = []
+    for result in current['results']:
+        for metric, value in result['metrics'].items():
+            old = previous.get((result['benchmark'], result['case'], metric))
+            if not old:
+                continue
+            if metric in THROUGHPUT_METRICS:
+                worse = value < old * (1 - tolerance)
+            else:
+                worse = value > old * (1 + tolerance)
+            if worse:
+                regressions.append((result['benchmark'], result['case'], metric, old, value))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the simulation hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="play_simulation batch sizes")
+    parser.add_argument('--iterations', type=int, default=10000, help="calls per micro-benchmark")
+    parser.add_argument('--cases', nargs='+', default=None, help="subset of cases to run")
+    parser.add_argument('--output', default=None, help="write the json report here")
+    parser.add_argument('--compare', default=None, help="json report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.iterations, args.cases)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        for benchmark, case, metric, old, new in regressions:
+            print(f"REGRESSION {benchmark} {case or '-'} {metric}: {old:,.2f} -> {new:,.2f}")
+        if regressions:
+            return 1
+        print(f"No regression against {baseline.get('commit') or args.compare}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
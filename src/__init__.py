@@ -1,5 +1,31 @@
 from .play import play_game
 from .play import play_session
 from .play import play_simulation
+from .rng import make_rng
+from .rng import spawn_rng
+from .sampler import Tilt
 from .ev import get_game_ev
 from .ev import get_all_games_ev
+from .ev import get_all_games_metrics
+from .vectorized import play_session_batch
+from .vectorized import play_simulation_batch
+from .batch import run_batch
+from .batch import load_batch
+from .batch import open_batch
+from .batch import aggregate_batch
+from .batch import run_until_converged
+from .cache import cached_batch
+from .stats import BankrollAggregator
+from .stats import TailEstimator
+from .analysis import run_metrics
+from .analysis import bankroll_curves
+from .solver import solve_session
+from .solver import solve_simulation
+from .sweep import sweep_session
+from .sweep import sweep_simulation
+from .variance import summarize_batch
+from .variance import compare_sessions
+from .schema_validator import validate_config_tree
+from .instrument import recording
+from .floor import play_floor
+from .floor import floor_risk
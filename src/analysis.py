@@ -0,0 +1,390 @@
+import numpy as np
+from .storage import ACTION_TYPES, RunStore, encode_runs
+
+PLAY = ACTION_TYPES.index('play')
+WITHDRAW = ACTION_TYPES.index('withdraw')
+APORT = ACTION_TYPES.index('aport')
+
+# rows of the padded curve matrix built at once in run_metrics
+CHUNK_RUNS = 4096
+
+
+def _columns(batch) -> dict:
+    """Columns of a RunStore, or of a list of play_simulation results encoded in one pass."""
+    if isinstance(batch, RunStore):
+        return {name: batch.column(name) for name in (
+            'run-offsets', 'bet-offsets', 'action-type', 'action-size', 'action-bankroll',
+            'bet-size', 'payment', 'bankroll',
+        )}
+    return encode_runs(batch)
+
+
+def _curves(columns: dict) -> tuple:
+    """Flat bankroll curves (see stats.bankroll_curve) and the offset of each run in them."""
+    run_offsets = columns['run-offsets']
+    bet_offsets = columns['bet-offsets']
+    bet_counts = np.diff(bet_offsets)
+
+    # a play action with bets contributes its bets, any other action its bankroll
+    with_bets = (columns['action-type'] == PLAY) & (bet_counts > 0)
+    lengths = np.where(with_bets, bet_counts, 1)
+    starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=starts[1:])
+
+    values = np.empty(starts[-1])
+    bet_action = np.repeat(np.arange(len(bet_counts)), bet_counts)
+    values[starts[bet_action] + np.arange(len(bet_action)) - bet_offsets[bet_action]] = columns['bankroll']
+    values[starts[:-1][~with_bets]] = columns['action-bankroll'][~with_bets]
+
+    return values, starts[run_offsets]
+
+
+def _start_bankrolls(columns: dict) -> np.ndarray:
+    """Bankroll of each run before its first action."""
+    first = columns['run-offsets'][:-1]
+    action_type = columns['action-type'][first]
+    bankroll = columns['action-bankroll'][first].copy()
+
+    size = columns['action-size'][first]
+    bankroll[action_type == WITHDRAW] += size[action_type == WITHDRAW]
+    bankroll[action_type == APORT] -= size[action_type == APORT]
+
+    first_bet = columns['bet-offsets'][first]
+    played = (action_type == PLAY) & (columns['bet-offsets'][first + 1] > first_bet)
+    bet = first_bet[played]
+    bankroll[played] = columns['bankroll'][bet] + columns['bet-size'][bet] - columns['payment'][bet]
+    return bankroll
+
+
+def bankroll_curves(batch) -> tuple:
+    """
+    Ragged bankroll curves of a batch.
+
+    Args:
+        batch: RunStore (see open_batch) or list of play_simulation results
+
+    Returns:
+        (values, offsets): run i's curve is values[offsets[i]:offsets[i + 1]]
+    """
+    return _curves(_columns(batch))
+
+
+def curve_matrix(values: np.ndarray, offsets: np.ndarray, steps: int = None, fill: float = np.nan) -> np.ndarray:
+    """
+    Pads ragged curves into a (runs x steps) matrix.
+
+    Args:
+        values, offsets: Ragged curves, as returned by bankroll_curves
+        steps: Number of columns (default: the longest curve); longer curves are cut
+        fill: Value after the end of a curve; None repeats its last value
+
+    Returns:
+        Matrix with one row per curve
+    """
+    lengths = np.diff(offsets)
+    if steps is None:
+        steps = int(lengths.max()) if lengths.size else 0
+
+    if fill is None:
+        last = np.full(lengths.size, np.nan)
+        last[lengths > 0] = values[offsets[1:][lengths > 0] - 1]
+        matrix = np.repeat(last[:, None], steps, axis=1)
+    else:
+        matrix = np.full((lengths.size, steps), fill, dtype=np.float64)
+
+    kept = np.minimum(lengths, steps)
+    rows = np.repeat(np.arange(lengths.size), kept)
+    cols = np.arange(rows.size) - np.repeat(np.cumsum(kept) - kept, kept)
+    matrix[rows, cols] = values[offsets[rows] + cols]
+    return matrix
+
+
+def step_mean(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Mean bankroll per step, over the curves that reached that step."""
+    lengths = np.diff(offsets)
+    steps = np.arange(values.size) - np.repeat(offsets[:-1], lengths)
+    return np.bincount(steps, weights=values) / np.bincount(steps)
+
+
+def run_metrics(batch, start_bankroll: float = None) -> dict:
+    """
+    Per-run metrics of a batch, as arrays with one entry per run.
+
+    Args:
+        batch: RunStore (see open_batch) or list of play_simulation results
+        start_bankroll: Starting bankroll; by default it is recovered from
+            the first action of each run
+
+    Returns:
+        Dict of arrays: 'start-bankroll', 'final', 'profit', 'profit-pct'
+        (profit in % of the start), 'min-bankroll' and 'max-bankroll' (over
+        the bankroll curve), 'max-drawdown' (largest drop from a running
+        peak that starts at the starting bankroll), 'bets' and 'sessions'
+    """
+    columns = _columns(batch)
+    run_offsets = columns['run-offsets']
+    bet_offsets = columns['bet-offsets']
+    runs = len(run_offsets) - 1
+
+    if start_bankroll is None:
+        start = _start_bankrolls(columns)
+    else:
+        start = np.full(runs, start_bankroll, dtype=np.float64)
+
+    values, offsets = _curves(columns)
+    final = columns['action-bankroll'][run_offsets[1:] - 1] if runs else np.zeros(0)
+
+    min_bankroll = np.empty(runs)
+    max_bankroll = np.empty(runs)
+    drawdown = np.empty(runs)
+    for first in range(0, runs, CHUNK_RUNS):
+        last = min(first + CHUNK_RUNS, runs)
+        chunk = offsets[first:last + 1]
+        matrix = curve_matrix(values, chunk, fill=None)
+
+        min_bankroll[first:last] = matrix.min(axis=1)
+        max_bankroll[first:last] = matrix.max(axis=1)
+        peaks = np.maximum.accumulate(np.maximum(matrix, start[first:last, None]), axis=1)
+        drawdown[first:last] = np.maximum((peaks - matrix).max(axis=1), 0)
+
+    sessions = np.zeros(len(columns['action-type']) + 1, dtype=np.int64)
+    np.cumsum(columns['action-type'] == PLAY, out=sessions[1:])
+
+    profit = final - start
+    return {
+        'start-bankroll': start,
+        'final': final,
+        'profit': profit,
+        'profit-pct': profit / start * 100,
+        'min-bankroll': min_bankroll,
+        'max-bankroll': max_bankroll,
+        'max-drawdown': drawdown,
+        'bets': bet_offsets[run_offsets[1:]] - bet_offsets[run_offsets[:-1]],
+        'sessions': sessions[run_offsets[1:]] - sessions[run_offsets[:-1]],
+    }
+
+
+def percentiles(values, qs) -> np.ndarray:
+    """
+    Percentiles by rank: the value at sorted index int(n * q / 100), as the
+    notebook reports them.
+    """
+    ordered = np.sort(np.asarray(values))
+    index = np.minimum((len(ordered) * np.asarray(qs, dtype=np.float64) / 100).astype(np.int64), len(ordered) - 1)
+    return ordered[index]
+
+
+def bucket_counts(values, edges) -> np.ndarray:
+    """Number of values in each [edges[i], edges[i + 1]) bucket."""
+    edges = np.asarray(edges, dtype=np.float64)
+    index = np.searchsorted(edges, np.asarray(values), side='right') - 1
+    inside = (index >= 0) & (index < len(edges) - 1)
+    return np.bincount(index[inside], minlength=len(edges) - 1)
+
+
+def survival_curve(values) -> tuple:
+    """
+    Empirical survival function.
+
+    Returns:
+        (x, y): the sorted values and, for each, the fraction of values
+        at or above its rank ((n - i) / n)
+    """
+    ordered = np.sort(np.asarray(values))
+    n = len(ordered)
+    return ordered, (n - np.arange(n)) / n if n else np.zeros(0)
+
+
+def survival(values, thresholds) -> np.ndarray:
+    """Fraction of values >= each threshold."""
+    ordered = np.sort(np.asarray(values))
+    if not len(ordered):
+        return np.full(len(thresholds), np.nan)
+    return (len(ordered) - np.searchsorted(ordered, np.asarray(thresholds), side='left')) / len(ordered)
+
+
+def lttb(x, y, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each of the 'points' - 2
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+
+    Returns:
+        Sorted indexes of the kept points
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        raise ValueError("LTTB needs at least 3 points")
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    kept = [0]
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        following = slice(end, edges[bucket + 2] if bucket + 2 < len(edges) else n)
+        mean_x = x[following].mean()
+        mean_y = y[following].mean()
+
+        a = kept[-1]
+        areas = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        kept.append(start + int(areas.argmax()))
+    kept.append(n - 1)
+    return np.array(kept)
+
+
+class CurveBands:
+    """
+    Per-step distribution of bankroll curves, in memory independent of the runs.
+
+    Every recorded step keeps a histogram of the bankroll over [low, high]
+    (with under/overflow bins), its sum, count, min and max, so the mean
+    and any quantile band come out at the end without keeping curves. Only
+    every 'stride'-th step is recorded. As with the mean curve, a step
+    only counts the runs that reached it. Bands built over parts of a
+    batch combine with merge().
+
+    Args:
+        low: Lower bound of the histograms
+        high: Upper bound of the histograms
+        bins: Number of bins per step
+        stride: Record steps 0, stride, 2 x stride, ...
+    """
+
+    def __init__(self, low: float, high: float, bins: int = 200, stride: int = 1):
+        if high <= low:
+            raise ValueError("Band 'high' must be greater than 'low'")
+        if stride < 1:
+            raise ValueError("Band 'stride' must be at least 1")
+
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.stride = stride
+        self.counts = np.zeros((0, bins + 2), dtype=np.int64)
+        self.sums = np.zeros(0)
+        self.mins = np.zeros(0)
+        self.maxs = np.zeros(0)
+
+    def _reserve(self, steps: int) -> None:
+        have = len(self.sums)
+        if steps <= have:
+            return
+        extra = steps - have
+        self.counts = np.concatenate([self.counts, np.zeros((extra, self.bins + 2), dtype=np.int64)])
+        self.sums = np.concatenate([self.sums, np.zeros(extra)])
+        self.mins = np.concatenate([self.mins, np.full(extra, np.inf)])
+        self.maxs = np.concatenate([self.maxs, np.full(extra, -np.inf)])
+
+    def _columns(self, values: np.ndarray) -> np.ndarray:
+        scaled = (values - self.low) / (self.high - self.low) * self.bins
+        return np.where(values < self.low, 0, np.where(values >= self.high, self.bins + 1, scaled.astype(np.int64) + 1))
+
+    def add_curve(self, curve) -> None:
+        """Adds one run given as its bankroll after each bet."""
+        values = np.asarray(curve, dtype=np.float64)[::self.stride]
+        steps = len(values)
+        self._reserve(steps)
+
+        self.counts[np.arange(steps), self._columns(values)] += 1
+        self.sums[:steps] += values
+        np.minimum(self.mins[:steps], values, out=self.mins[:steps])
+        np.maximum(self.maxs[:steps], values, out=self.maxs[:steps])
+
+    def add_curves(self, values: np.ndarray, offsets: np.ndarray) -> None:
+        """Adds ragged curves, as returned by bankroll_curves, in one pass."""
+        lengths = np.diff(offsets)
+        steps = np.arange(len(values)) - np.repeat(offsets[:-1], lengths)
+        recorded = steps % self.stride == 0
+        steps = steps[recorded] // self.stride
+        values = values[recorded]
+        if not len(steps):
+            return
+        self._reserve(int(steps.max()) + 1)
+
+        np.add.at(self.counts, (steps, self._columns(values)), 1)
+        self.sums += np.bincount(steps, weights=values, minlength=len(self.sums))
+        np.minimum.at(self.mins, steps, values)
+        np.maximum.at(self.maxs, steps, values)
+
+    def merge(self, other) -> None:
+        if (other.low, other.high, other.bins, other.stride) != (self.low, self.high, self.bins, self.stride):
+            raise ValueError("Cannot merge bands with different histograms or strides")
+
+        steps = len(other.sums)
+        self._reserve(steps)
+        self.counts[:steps] += other.counts
+        self.sums[:steps] += other.sums
+        np.minimum(self.mins[:steps], other.mins, out=self.mins[:steps])
+        np.maximum(self.maxs[:steps], other.maxs, out=self.maxs[:steps])
+
+    @property
+    def steps(self) -> np.ndarray:
+        """Bet number of each recorded step."""
+        return np.arange(len(self.sums)) * self.stride
+
+    @property
+    def runs(self) -> np.ndarray:
+        """Number of runs that reached each recorded step."""
+        return self.counts.sum(axis=1)
+
+    def mean(self) -> np.ndarray:
+        return self.sums / self.runs
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        Approximate q-quantile at each recorded step, interpolated inside
+        its bin and clamped to the exact min/max, as BankrollAggregator.quantile.
+        """
+        runs = self.runs
+        cumulative = self.counts.cumsum(axis=1)
+        target = q * runs
+        column = (cumulative >= target[:, None]).argmax(axis=1)
+
+        rows = np.arange(len(runs))
+        before = np.where(column > 0, cumulative[rows, np.maximum(column - 1, 0)], 0)
+        count = np.maximum(self.counts[rows, column], 1)
+        width = (self.high - self.low) / self.bins
+        value = self.low + (column - 1 + (target - before) / count) * width
+
+        value = np.where(column == 0, self.mins, np.where(column == self.bins + 1, self.maxs, value))
+        return np.clip(value, self.mins, self.maxs)
+
+    def to_dict(self, quantiles: tuple = (0.05, 0.25, 0.5, 0.75, 0.95), points: int = None,
+                method: str = 'lttb') -> dict:
+        """
+        Mean curve and quantile bands, optionally downsampled.
+
+        Args:
+            quantiles: Quantiles of the bands
+            points: Keep at most this many steps (default: all of them)
+            method: 'lttb' picks the steps that preserve the shape of the
+                mean curve, 'stride' keeps evenly spaced steps; every band
+                uses the same steps
+
+        Returns:
+            Dict with 'steps' (bet numbers), 'runs' (runs reaching each
+            step), 'mean' and 'bands' (quantile -> values), as lists
+        """
+        steps = self.steps
+        mean = self.mean()
+
+        if points is None or points >= len(steps):
+            kept = np.arange(len(steps))
+        elif method == 'lttb':
+            kept = lttb(steps, mean, points)
+        elif method == 'stride':
+            kept = np.unique(np.linspace(0, len(steps) - 1, points).astype(np.int64))
+        else:
+            raise ValueError(f"Unknown downsampling method '{method}', expected 'lttb' or 'stride'")
+
+        return {
+            'steps': steps[kept].tolist(),
+            'runs': self.runs[kept].tolist(),
+            'mean': mean[kept].tolist(),
+            'bands': {q: self.quantile(q)[kept].tolist() for q in quantiles},
+        }
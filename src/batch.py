@@ -0,0 +1,361 @@
+import os
+import json
+import math
+import secrets
+import argparse
+from contextlib import nullcontext
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+from .play import play_simulation
+from .finder import find_simulation_by_name
+from .rng import spawn_rng
+from .storage import RunStore, write_runs
+from .stats import BankrollAggregator
+from . import instrument
+
+MANIFEST_NAME = 'manifest.json'
+SHARD_PREFIX = 'shard-'
+SHARD_SUFFIX = '.npz'
+
+# statistics run_until_converged can target, as half-widths of their interval
+CONVERGENCE_TARGETS = ('mean-profit', 'ruin-probability')
+
+
+def _shard_name(start: int, end: int) -> str:
+    return f"{SHARD_PREFIX}{start:09d}-{end:09d}{SHARD_SUFFIX}"
+
+
+def list_shards(output_dir: str) -> list:
+    """Returns the (start, end, path) of every complete shard, sorted by start."""
+    shards = []
+    if not os.path.isdir(output_dir):
+        return shards
+
+    for filename in os.listdir(output_dir):
+        if not (filename.startswith(SHARD_PREFIX) and filename.endswith(SHARD_SUFFIX)):
+            continue
+        start, end = filename[len(SHARD_PREFIX):-len(SHARD_SUFFIX)].split('-')
+        shards.append((int(start), int(end), os.path.join(output_dir, filename)))
+
+    shards.sort()
+    return shards
+
+
+def _missing_ranges(shards: list, runs: int, chunk_size: int) -> list:
+    """Splits the run indexes in [0, runs) not covered by a shard into chunks."""
+    ranges = []
+    position = 0
+    for start, end, _ in shards + [(runs, runs, None)]:
+        start = min(start, runs)
+        while position < start:
+            ranges.append((position, min(position + chunk_size, start)))
+            position = ranges[-1][1]
+        position = max(position, end)
+    return ranges
+
+
+def _read_manifest(output_dir: str, simulation: str, seed) -> int:
+    """Returns the batch seed, checking it against an existing manifest."""
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest['simulation'] != simulation:
+            raise ValueError(
+                f"Directory '{output_dir}' holds a batch of simulation '{manifest['simulation']}'"
+            )
+        if seed is not None and seed != manifest['seed']:
+            raise ValueError(
+                f"Directory '{output_dir}' holds a batch with seed {manifest['seed']}, not {seed}"
+            )
+        return manifest['seed']
+
+    if seed is None:
+        seed = secrets.randbits(63)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'simulation': simulation, 'seed': seed}, f)
+    return seed
+
+
+def _run_shard(task: tuple) -> str:
+    simulations_dir, sessions_dir, games_dir, simulation, seed, start, end, output_dir = task
+
+    runs = []
+    for i in range(start, end):
+        with instrument.phase('rng'):
+            rng = spawn_rng(seed, i)
+        runs.append(play_simulation(simulations_dir, sessions_dir, games_dir, simulation, rng))
+
+    # write to a temporary name first, so a crash never leaves a partial shard
+    path = os.path.join(output_dir, _shard_name(start, end))
+    tmp_path = path + '.tmp'
+    with instrument.phase('write'), open(tmp_path, 'wb') as f:
+        write_runs(f, runs)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_batch(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, runs: int,
+              output_dir: str, seed=None, workers: int = None, chunk_size: int = 1000) -> list:
+    """
+    Plays 'runs' simulations across a process pool, one shard file per chunk.
+
+    Run i always uses the substream spawn_rng(seed, i), so the output does not
+    depend on the worker count or chunk size. Shards already present in
+    'output_dir' are kept, which lets an interrupted or extended batch resume
+    where it stopped. Under instrument.recording(), the measurements of the
+    workers are merged into the active recorder.
+
+    Args:
+        simulations_dir: Directory containing simulation configurations
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        simulation: Name of the simulation to play
+        runs: Total number of runs in the batch
+        output_dir: Directory receiving the manifest and the shards
+        seed: Batch seed; None picks a random one (or reuses the manifest's)
+        workers: Number of worker processes (None uses every core, 1 runs inline)
+        chunk_size: Number of runs per shard
+
+    Returns:
+        List of the shard paths covering [0, runs), sorted by run index
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    os.makedirs(output_dir, exist_ok=True)
+    seed = _read_manifest(output_dir, simulation, seed)
+
+    tasks = [
+        (simulations_dir, sessions_dir, games_dir, simulation, seed, start, end, output_dir)
+        for start, end in _missing_ranges(list_shards(output_dir), runs, chunk_size)
+    ]
+
+    if workers == 1:
+        for task in tasks:
+            _run_shard(task)
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(instrument.wrap(_run_shard), tasks):
+                instrument.unwrap(result)
+
+    return [path for start, end, path in list_shards(output_dir) if start < runs]
+
+
+def aggregate_chunk(task: tuple) -> BankrollAggregator:
+    """
+    Plays runs [start, end) of a simulation into a fresh BankrollAggregator.
+
+    'task' is (simulations_dir, sessions_dir, games_dir, simulation, seed,
+    start, end, tilt, options), so chunks can be mapped over a process pool
+    and merged in run order.
+    """
+    simulations_dir, sessions_dir, games_dir, simulation, seed, start, end, tilt, options = task
+
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+    aggregator = BankrollAggregator(sim_config['start-bankroll'], **options)
+    for i in range(start, end):
+        with instrument.phase('rng'):
+            rng = spawn_rng(seed, i)
+        aggregator.add(play_simulation(
+            simulations_dir, sessions_dir, games_dir, simulation, rng, tilt=tilt
+        ))
+    return aggregator
+
+
+def aggregate_batch(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, runs: int,
+                    seed=None, workers: int = None, chunk_size: int = 1000, tilt=None,
+                    **options) -> BankrollAggregator:
+    """
+    Plays 'runs' simulations across a process pool, keeping only their aggregate.
+
+    Each worker feeds its chunk of runs into a BankrollAggregator and the
+    chunks are merged, so memory stays constant whatever the run count. Run i
+    uses spawn_rng(seed, i), exactly as in run_batch.
+
+    Args:
+        tilt: Optional Tilt; runs are then drawn from the tilted tables and
+            the aggregator's 'tails' reweight them (rare-event mode)
+        options: Options forwarded to BankrollAggregator (low, high, bins,
+            lower_tails, upper_tails, band_stride, band_bins)
+
+    Returns:
+        BankrollAggregator: Summary of every run of the batch
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if seed is None:
+        seed = secrets.randbits(63)
+
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+    aggregator = BankrollAggregator(sim_config['start-bankroll'], **options)
+
+    tasks = [
+        (simulations_dir, sessions_dir, games_dir, simulation, seed, start, min(start + chunk_size, runs), tilt, options)
+        for start in range(0, runs, chunk_size)
+    ]
+
+    if workers == 1:
+        for task in tasks:
+            aggregator.merge(aggregate_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(instrument.wrap(aggregate_chunk), tasks):
+                aggregator.merge(instrument.unwrap(chunk))
+
+    return aggregator
+
+
+def half_widths(aggregator: BankrollAggregator, z: float) -> dict:
+    """
+    Confidence interval half-widths of the CONVERGENCE_TARGETS.
+
+    The ruin probability uses the Agresti-Coull interval, which stays
+    honest when no run (or every run) has gone bankrupt yet.
+    """
+    runs = aggregator.runs
+    ruin = (aggregator.bankrupt + z * z / 2) / (runs + z * z)
+    return {
+        'mean-profit': z * math.sqrt(aggregator.final.variance / runs) if runs > 1 else math.inf,
+        'ruin-probability': z * math.sqrt(ruin * (1 - ruin) / (runs + z * z)),
+    }
+
+
+def run_until_converged(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, targets: dict,
+                        seed=None, workers: int = None, chunk_size: int = 1000, min_runs: int = 1000,
+                        max_runs: int = 1000000, confidence: float = 0.95, **options) -> dict:
+    """
+    Plays chunks of runs until every target precision is met.
+
+    Chunks are aggregated in run order and the intervals are checked after
+    each one, so the runs used are always a prefix [0, runs) of the batch
+    (run i uses spawn_rng(seed, i), as in run_batch) and do not depend on
+    the worker count. Chunks computed past the stopping point are dropped.
+
+    Args:
+        simulations_dir: Directory containing simulation configurations
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        simulation: Name of the simulation to play
+        targets: Statistic -> wanted half-width of its interval, for any of
+            CONVERGENCE_TARGETS (e.g. {'ruin-probability': 0.002, 'mean-profit': 1})
+        seed: Batch seed; None picks a random one
+        workers: Number of worker processes (None uses every core, 1 runs inline)
+        chunk_size: Number of runs between two checks
+        min_runs: Never stop before this many runs
+        max_runs: Stop here even if a target is not met
+        confidence: Confidence level of the intervals
+        options: Options forwarded to BankrollAggregator
+
+    Returns:
+        Dict with 'runs' (runs used), 'seed', 'converged' (every target
+        met), 'estimates' (statistic -> 'estimate', 'half-width', 'target')
+        and the 'aggregator' of the runs used
+    """
+    unknown = set(targets) - set(CONVERGENCE_TARGETS)
+    if unknown:
+        raise ValueError(f"Unknown convergence targets {sorted(unknown)}, expected any of {CONVERGENCE_TARGETS}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if seed is None:
+        seed = secrets.randbits(63)
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+    aggregator = BankrollAggregator(sim_config['start-bankroll'], **options)
+
+    tasks = (
+        (simulations_dir, sessions_dir, games_dir, simulation, seed, start, min(start + chunk_size, max_runs), None, options)
+        for start in range(0, max_runs, chunk_size)
+    )
+
+    def converged() -> bool:
+        if aggregator.runs < min_runs:
+            return False
+        widths = half_widths(aggregator, z)
+        return all(widths[statistic] <= target for statistic, target in targets.items())
+
+    if workers == 1:
+        for task in tasks:
+            aggregator.merge(aggregate_chunk(task))
+            if converged():
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # keep a couple of chunks per worker in flight, consumed in run order
+            window = 2 * (workers or os.cpu_count() or 1)
+            function = instrument.wrap(aggregate_chunk)
+            pending = []
+            for task in tasks:
+                pending.append(executor.submit(function, task))
+                if len(pending) < window:
+                    continue
+                aggregator.merge(instrument.unwrap(pending.pop(0).result()))
+                if converged():
+                    break
+            else:
+                while pending and not converged():
+                    aggregator.merge(instrument.unwrap(pending.pop(0).result()))
+            for future in pending:
+                future.cancel()
+
+    widths = half_widths(aggregator, z)
+    estimates = {
+        'mean-profit': aggregator.final.mean - aggregator.start_bankroll,
+        'ruin-probability': aggregator.bankrupt / aggregator.runs if aggregator.runs else math.nan,
+    }
+    return {
+        'runs': aggregator.runs,
+        'seed': seed,
+        'converged': converged(),
+        'estimates': {
+            statistic: {'estimate': estimates[statistic], 'half-width': widths[statistic], 'target': target}
+            for statistic, target in targets.items()
+        },
+        'aggregator': aggregator,
+    }
+
+
+def open_batch(output_dir: str, runs: int = None) -> RunStore:
+    """Opens the columns of a batch, in run order, optionally only the first 'runs'."""
+    paths = [
+        path for start, end, path in list_shards(output_dir)
+        if runs is None or start < runs
+    ]
+    return RunStore(paths, runs)
+
+
+def load_batch(output_dir: str, runs: int = None) -> list:
+    """Loads the runs of a batch in the play_simulation format."""
+    return open_batch(output_dir, runs).runs()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Plays a batch of simulations across a process pool.")
+    parser.add_argument('simulation', help="name of the simulation to play")
+    parser.add_argument('--runs', type=int, required=True, help="total number of runs")
+    parser.add_argument('--output', required=True, help="directory receiving the shards")
+    parser.add_argument('--seed', type=int, default=None, help="batch seed")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="runs per shard")
+    parser.add_argument('--profile', default=None, help="write an instrumentation summary (JSON) to this path")
+    parser.add_argument('--simulations-dir', default='config/simulations')
+    parser.add_argument('--sessions-dir', default='config/sessions')
+    parser.add_argument('--games-dir', default='config/games')
+    args = parser.parse_args(argv)
+
+    with instrument.recording() if args.profile else nullcontext() as recorder:
+        shards = run_batch(
+            args.simulations_dir, args.sessions_dir, args.games_dir, args.simulation, args.runs,
+            args.output, seed=args.seed, workers=args.workers, chunk_size=args.chunk_size,
+        )
+    print(f"{args.runs} runs of '{args.simulation}' in {len(shards)} shards at '{args.output}'")
+    if recorder is not None:
+        recorder.write_json(args.profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+from .finder import find_game_by_name, find_session_by_name, find_simulation_by_name
+from .play import ENGINE_VERSION
+from .batch import run_batch
+
+DEFAULT_CACHE_DIR = '.bankroll-cache'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# resolved configurations of an entry, kept for inspection
+CONFIG_NAME = 'config.json'
+
+
+def resolve_configs(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str) -> dict:
+    """
+    Every configuration a simulation depends on.
+
+    Returns:
+        Dict with the 'simulation' config and the 'sessions' and 'games'
+        it references, each a name -> config mapping
+    """
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+    sessions = {}
+    games = {}
+
+    for action in sim_config['actions']:
+        if action['type'] != 'play' or action['name'] in sessions:
+            continue
+        session_config = find_session_by_name(sessions_dir, action['name'])
+        sessions[action['name']] = session_config
+        for bet_config in session_config['bets']:
+            if bet_config['game'] not in games:
+                games[bet_config['game']] = find_game_by_name(games_dir, bet_config['game'])
+
+    return {'simulation': sim_config, 'sessions': sessions, 'games': games}
+
+
+def batch_key(configs: dict, seed: int) -> str:
+    """Content hash of the resolved configurations, the engine version and the seed."""
+    content = json.dumps(
+        {'engine': ENGINE_VERSION, 'seed': seed, 'configs': configs},
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _entry_size(path: str) -> int:
+    size = 0
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return size
+
+
+def cache_entries(cache_dir: str = DEFAULT_CACHE_DIR) -> list:
+    """Returns the (path, size in bytes, last use time) of every entry, least recently used first."""
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isdir(path):
+            entries.append((path, _entry_size(path), os.stat(path).st_mtime))
+    entries.sort(key=lambda entry: entry[2])
+    return entries
+
+
+def evict(cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, keep=()) -> list:
+    """
+    Deletes least recently used entries until the cache fits in 'max_bytes'.
+
+    Args:
+        keep: Entry paths never deleted (e.g. the one just used)
+
+    Returns:
+        Paths of the deleted entries
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+
+    removed = []
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def cached_batch(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, runs: int, seed: int = 0,
+                 cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, workers: int = None,
+                 chunk_size: int = 1000) -> str:
+    """
+    Returns the directory of a batch, playing only the runs not cached yet.
+
+    Entries are keyed by the content of every configuration the simulation
+    uses, ENGINE_VERSION and the seed, so editing a game, session or
+    simulation file leads to a new entry while the old one ages out. The
+    run count is not part of the key: asking for more runs than an entry
+    holds plays only the missing ones (see run_batch), and asking for fewer
+    reuses a prefix of it (open_batch(path, runs)).
+
+    Args:
+        simulations_dir: Directory containing simulation configurations
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        simulation: Name of the simulation to play
+        runs: Number of runs needed
+        seed: Batch seed
+        cache_dir: Directory holding the entries
+        max_bytes: Size cap of the cache; least recently used entries are
+            evicted past it, never the one returned
+        workers: Number of worker processes (None uses every core, 1 runs inline)
+        chunk_size: Number of runs per shard
+
+    Returns:
+        Path of the entry, to be read with open_batch / load_batch
+    """
+    if seed is None:
+        raise ValueError("Cached batches need an explicit seed")
+
+    configs = resolve_configs(simulations_dir, sessions_dir, games_dir, simulation)
+    path = os.path.join(cache_dir, batch_key(configs, seed))
+
+    os.makedirs(path, exist_ok=True)
+    config_path = os.path.join(path, CONFIG_NAME)
+    if not os.path.exists(config_path):
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({'engine': ENGINE_VERSION, 'seed': seed, 'configs': configs}, f, indent=4)
+
+    run_batch(
+        simulations_dir, sessions_dir, games_dir, simulation, runs, path,
+        seed=seed, workers=workers, chunk_size=chunk_size,
+    )
+
+    # the entry mtime is its last use, for eviction
+    now = time.time()
+    os.utime(path, (now, now))
+    evict(cache_dir, max_bytes, keep=(path,))
+    return path
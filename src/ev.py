@@ -1,5 +1,11 @@
-import os
-from .finder import find_game_by_name
+import numpy as np
+from .finder import get_registry, find_game_by_name
+from .schema_validator import validate_game_schema
+from .sampler import get_sampler
+from . import instrument
+
+# bisection steps of the Kelly fraction; the bracket shrinks by 2^-60
+KELLY_ITERATIONS = 60
 
 
 def _compute_ev(possible_results: list) -> float:
@@ -7,9 +13,7 @@ def _compute_ev(possible_results: list) -> float:
     return round(ev, 6)
 
 
-def get_game_ev(games_dir: str, game_name: str) -> dict:
-    game = find_game_by_name(games_dir, game_name)
-
+def _game_ev(game: dict) -> dict:
     if game.get('multi-bet-type'):
         bet_types = {}
         for bet_type, config in game['bet-types'].items():
@@ -18,15 +22,103 @@ def get_game_ev(games_dir: str, game_name: str) -> dict:
 
     return {"name": game['name'], "ev": _compute_ev(game['possible-results'])}
 
+
+def get_game_ev(games_dir: str, game_name: str) -> dict:
+    with instrument.phase('ev'):
+        return _game_ev(find_game_by_name(games_dir, game_name))
+
 def get_all_games_ev(games_dir: str) -> dict:
-    import json
-    games_ev = {}
-    for filename in os.listdir(games_dir):
-        if not filename.endswith('.json'):
-            continue
-        filepath = os.path.join(games_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            game_name = json.load(f).get('name')
-        if game_name:
-            games_ev[game_name] = get_game_ev(games_dir, game_name)
-    return games_ev
\ No newline at end of file
+    with instrument.phase('ev'):
+        registry = get_registry(games_dir, validate_game_schema)
+        return {name: _game_ev(registry.get(name)) for name in registry.names()}
+
+
+def _kelly_fractions(returns: np.ndarray, chances: np.ndarray, ev: np.ndarray) -> np.ndarray:
+    """
+    Fraction f of the bankroll maximizing E[log(1 + f r)], per row.
+
+    The derivative sum(p r / (1 + f r)) decreases in f, so it is bisected
+    on [0, 1]: returns are at least -1 (multipliers are non-negative), so
+    1 + f r stays positive below f = 1. Rows with a non-positive EV get 0;
+    rows that never lose tend to 1.
+    """
+    low = np.zeros(len(ev))
+    high = np.ones(len(ev))
+
+    weighted = chances * returns
+    terms = np.zeros_like(weighted)
+    for _ in range(KELLY_ITERATIONS):
+        middle = (low + high) / 2
+        np.divide(weighted, 1 + middle[:, None] * returns, out=terms, where=chances > 0)
+        slope = terms.sum(axis=1)
+        rising = slope > 0
+        low = np.where(rising, middle, low)
+        high = np.where(rising, high, middle)
+
+    return np.where(ev > 0, low, 0.0)
+
+
+def get_all_games_metrics(games_dir: str) -> dict:
+    """
+    Return and risk metrics of every game and bet type, per unit staked.
+
+    Every game is read once through the registry and its compiled outcome
+    tables (see get_sampler) are stacked into one zero-padded matrix, so
+    the metrics of all bet types are computed together. The metrics
+    describe the outcome table as played, the implicit loss included.
+
+    Args:
+        games_dir: Directory containing game configurations
+
+    Returns:
+        Game name -> {'name', 'bet-types': {bet type -> metrics}} for
+        multi-bet games, {'name', 'metrics'} otherwise. Metrics are 'ev'
+        (mean net return), 'variance', 'std', 'skew', 'kelly-fraction'
+        (growth-optimal fraction of the bankroll to bet, 0 when the EV is
+        not positive) and 'win-probability' (chance of any net gain)
+    """
+    with instrument.phase('ev'):
+        return _games_metrics(get_registry(games_dir, validate_game_schema), games_dir)
+
+
+def _games_metrics(registry, games_dir: str) -> dict:
+    keys = []
+    samplers = []
+    for name in registry.names():
+        game = registry.get(name)
+        bet_types = game['bet-types'] if game['multi-bet-type'] else [None]
+        for bet_type in bet_types:
+            keys.append((name, bet_type))
+            samplers.append(get_sampler(games_dir, name, bet_type))
+
+    width = max((len(sampler) for sampler in samplers), default=0)
+    returns = np.zeros((len(samplers), width))
+    chances = np.zeros((len(samplers), width))
+    for row, sampler in enumerate(samplers):
+        returns[row, :len(sampler)] = np.asarray(sampler.multipliers, dtype=np.float64) - 1
+        chances[row, :len(sampler)] = sampler.chances
+
+    ev = (chances * returns).sum(axis=1)
+    deviations = returns - ev[:, None]
+    variance = (chances * deviations ** 2).sum(axis=1)
+    std = np.sqrt(variance)
+    third = (chances * deviations ** 3).sum(axis=1)
+    skew = np.divide(third, std ** 3, out=np.zeros_like(third), where=std > 0)
+    kelly = _kelly_fractions(returns, chances, ev)
+    win = (chances * (returns > 0)).sum(axis=1)
+
+    metrics = {}
+    for row, (name, bet_type) in enumerate(keys):
+        values = {
+            'ev': float(ev[row]),
+            'variance': float(variance[row]),
+            'std': float(std[row]),
+            'skew': float(skew[row]),
+            'kelly-fraction': float(kelly[row]),
+            'win-probability': float(win[row]),
+        }
+        if bet_type is None:
+            metrics[name] = {'name': name, 'metrics': values}
+        else:
+            metrics.setdefault(name, {'name': name, 'bet-types': {}})['bet-types'][bet_type] = values
+    return metrics
@@ -1,46 +1,153 @@
 import os
 import json
-from src.schema_validator import validate_game_schema,validate_session_schema
+from src.schema_validator import (
+    validate_game_schema, validate_session_schema, validate_simulation_schema,
+    file_digest, is_known_valid, mark_valid,
+)
+from src import instrument
 
-loaded_data = {}
+class ConfigRegistry:
+    """
+    Index of the json configurations of one directory, keyed by 'name'.
 
-def find_item_by_name(dir:str,name:str)->dict:
+    Each file is parsed once and re-parsed only when its mtime changes: a
+    lookup stats the file of the requested item, and only a name missing
+    from the index rescans the directory. Entries are validated on their
+    first lookup, so an invalid file only fails the lookups that actually
+    request it. Validity is remembered by content hash process-wide (see
+    validate_config_tree), so a file that was already checked, or touched
+    without changes, is not validated again.
+    """
 
-    for filename in os.listdir(dir):
+    def __init__(self, dir:str, validator=None):
+        self.dir = dir
+        self.validator = validator
+        self._files = {}
+        self._items = {}
+        self._owned = {}
 
-        if not filename.endswith('.json'):
-            continue
-        
-        filepath = os.path.join(dir, filename)
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        
-        try:
+    def _load(self, filepath:str, mtime:int) -> tuple:
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        return mtime, json.loads(raw), file_digest(raw)
+
+    def _index(self) -> None:
+        items = {}
+        for filepath, (mtime, json_data, digest) in self._files.items():
+            if not isinstance(json_data, dict):
+                continue
             item_name = json_data.get('name')
-        except:
-            raise ValueError(f"Item '{name}' not found in directory '{dir}'")
-        
+            if item_name is not None and item_name not in items:
+                items[item_name] = (json_data, digest, filepath)
+
+        self._items = items
+        self._owned = {id(json_data): json_data for json_data, _, _ in items.values()}
+
+    def refresh(self) -> None:
+        """Rescans the directory, reloading only the files whose mtime changed."""
+        files = {}
+        for filename in os.listdir(self.dir):
+
+            if not filename.endswith('.json'):
+                continue
+
+            filepath = os.path.join(self.dir, filename)
+            mtime = os.stat(filepath).st_mtime_ns
+
+            cached = self._files.get(filepath)
+            instrument.cache_event('registry-files', cached is not None and cached[0] == mtime)
+            if cached is not None and cached[0] == mtime:
+                files[filepath] = cached
+                continue
+
+            files[filepath] = self._load(filepath, mtime)
+
+        self._files = files
+        self._index()
+
+    def _is_current(self, filepath:str) -> bool:
+        """Whether a known file still has the mtime it was loaded with, reloading it if not."""
+        try:
+            mtime = os.stat(filepath).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        cached = self._files[filepath]
+        instrument.cache_event('registry-files', cached[0] == mtime)
+        if cached[0] != mtime:
+            self._files[filepath] = self._load(filepath, mtime)
+            self._index()
+        return True
+
+    def get(self, name:str) -> dict:
+        with instrument.phase('lookup'):
+            return self._get(name)
 
-        if item_name == name:
-            if filepath not in loaded_data:
-                loaded_data[filepath] = {}
-            
-            loaded_data[filepath][item_name] = json_data
-            return json_data
-    
-    raise ValueError(f"Item '{name}' not found in directory '{dir}'")   
+    def _get(self, name:str) -> dict:
+        entry = self._items.get(name)
+        if entry is not None:
+            # the file is reloaded if it changed, and may no longer hold 'name'
+            entry = self._items.get(name) if self._is_current(entry[2]) else None
+
+        if entry is None:
+            # the item may have been added, renamed or removed since the last scan
+            self.refresh()
+            entry = self._items.get(name)
+
+        if entry is None:
+            raise ValueError(f"Item '{name}' not found in directory '{self.dir}'")
+
+        item, digest, _ = entry
+        if self.validator is not None:
+            known = is_known_valid(self.validator, digest)
+            instrument.cache_event('validation', known)
+            if not known:
+                with instrument.phase('validate'):
+                    self.validator(item)
+                mark_valid(self.validator, digest)
+
+        return item
+
+    def owns(self, item:dict) -> bool:
+        """Whether 'item' is the dict the registry currently holds for one of its files."""
+        return self._owned.get(id(item)) is item
+
+    def names(self) -> list:
+        self.refresh()
+        return list(self._items)
+
+
+_registries = {}
+
+def get_registry(dir:str, validator=None) -> ConfigRegistry:
+    key = (os.path.abspath(dir), validator)
+    registry = _registries.get(key)
+    if registry is None:
+        registry = ConfigRegistry(dir, validator)
+        _registries[key] = registry
+    return registry
+
+def is_registry_item(item:dict) -> bool:
+    """
+    Whether a configuration dict is one loaded by a registry, as opposed to
+    one built by a caller. Registry dicts are replaced, never changed, when
+    their file changes.
+    """
+    return any(registry.owns(item) for registry in _registries.values())
+
+def clear_registries() -> None:
+    _registries.clear()
+
+
+def find_item_by_name(dir:str,name:str)->dict:
+    return get_registry(dir).get(name)
 
 
 def find_game_by_name(dir:str,name:str)->dict:
-    game = find_item_by_name(dir,name)
-    validate_game_schema(game)
-    return game
+    return get_registry(dir, validate_game_schema).get(name)
 
 def find_session_by_name(dir:str,name:str)->dict:
-    session = find_item_by_name(dir,name)
-    validate_session_schema(session)
-    return session
+    return get_registry(dir, validate_session_schema).get(name)
 
 def find_simulation_by_name(dir:str,name:str)->dict:
-    return find_item_by_name(dir,name)
\ No newline at end of file
+    return get_registry(dir, validate_simulation_schema).get(name)
@@ -0,0 +1,324 @@
+import math
+import heapq
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .finder import get_registry, find_session_by_name
+from .schema_validator import validate_session_schema
+from .plan import get_session_plan
+from .play import STOP_REASONS
+from .rng import make_rng, spawn_rng
+from .stats import Z_95
+
+# event kinds; at equal times a settlement is handled before a placement
+SETTLE = 0
+PLACE = 1
+
+STOP_COMPLETED = STOP_REASONS.index('completed')
+STOP_LOSS = STOP_REASONS.index('stop-loss')
+STOP_WIN = STOP_REASONS.index('stop-win')
+
+# stop reason code of a player still on the floor
+PLAYING = -1
+
+
+def _session_weights(sessions_dir: str, sessions) -> tuple:
+    """Resolves the 'sessions' argument of play_floor into (names, weights)."""
+    if sessions is None:
+        sessions = get_registry(sessions_dir, validate_session_schema).names()
+    if isinstance(sessions, dict):
+        names, weights = list(sessions), list(sessions.values())
+    else:
+        names, weights = list(sessions), [1.0] * len(sessions)
+    if not names:
+        raise ValueError(f"No sessions to play in '{sessions_dir}'")
+    return names, weights
+
+
+def _group_limits(plan, table_limits: dict) -> list:
+    """(min bet, max bet) of every bet group of a session plan, from the table of its game."""
+    limits = []
+    for bet_plan in plan.bets:
+        table = table_limits.get(bet_plan.game, {})
+        limits.append((table.get('min-bet', 0.0), table.get('max-bet', math.inf)))
+    return limits
+
+
+def play_floor(sessions_dir: str, games_dir: str, players: int, house_bankroll: float, bankroll=1000.0,
+               sessions=None, table_limits: dict = None, arrival_window: float = 3600.0, bet_interval: float = 30.0,
+               round_time: float = 10.0, max_exposure: float = None, report_interval: float = 60.0,
+               rng=None) -> dict:
+    """
+    Plays a casino floor: many players, each running a session, against one house.
+
+    Players arrive uniformly over 'arrival_window' and play their session
+    with the play_session rules: bet groups of a random quantity,
+    'bet-percent' sizes taken when a group starts, stop conditions checked
+    before every bet, and bets larger than the bankroll skipped. Each bet
+    stays open for 'round_time' seconds before it settles, and the player
+    places the next one an exponential think time (mean 'bet_interval')
+    later. Every placement and settlement is an event in one priority queue,
+    so bets of all players interleave in time and the house sees its true
+    open exposure.
+
+    Player state is kept in flat typed arrays (one column per field), and
+    the queue holds at most one event per player, so memory stays at a few
+    hundred bytes per player.
+
+    Table limits cap a group's size at the table's 'max-bet' when the group
+    starts, before the bankroll check. A bet under 'min-bet' is refused, and
+    as with a skipped bet the size stays the same for the rest of its group,
+    so the rest of the group is refused too. A bet that
+    would push the open exposure past 'max_exposure' is refused alone; the
+    player tries the next bet of the group after a think time.
+
+    Args:
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        players: Number of players
+        house_bankroll: Bankroll of the house when the floor opens
+        bankroll: Initial bankroll of every player, or session name -> bankroll
+        sessions: Sessions the players run: None for every session of
+            sessions_dir, a list of names (equally likely) or name -> weight
+        table_limits: Game name -> {'min-bet', 'max-bet'}
+        arrival_window: Players arrive uniformly over [0, arrival_window) seconds
+        bet_interval: Mean think time between a settlement and the next bet, in seconds
+        round_time: Seconds between placing a bet and its settlement
+        max_exposure: Optional cap on the house's open exposure
+        report_interval: Seconds between two points of the house curves
+        rng: Optional seed or random.Random generator (see make_rng)
+
+    Returns:
+        Dict with:
+        - 'house': 'start-bankroll', 'final-pnl', 'min-pnl', 'peak-exposure'
+          and its 'peak-exposure-time', 'ruined' and the 'ruin-time' (first
+          time the house bankroll reaches 0, None if never)
+        - 'curve': NumPy arrays sampled every report_interval: 'time',
+          'pnl' (house profit so far), 'exposure' (worst-case net payout of
+          the open bets) and 'open-bets'
+        - 'players': 'count', 'bets', 'skipped-bets', 'refused-bets', the
+          'stop-reasons' counts, 'mean-profit', 'sessions' (players per
+          session) and 'duration' (time of the last event)
+    """
+    rng = make_rng(rng)
+    random = rng.random
+    randint = rng.randint
+    expovariate = rng.expovariate
+    table_limits = table_limits or {}
+    max_exposure = math.inf if max_exposure is None else max_exposure
+
+    names, weights = _session_weights(sessions_dir, sessions)
+    plans = [get_session_plan(find_session_by_name(sessions_dir, name), games_dir) for name in names]
+    limits = [_group_limits(plan, table_limits) for plan in plans]
+    # worst-case net payout per unit staked, per session and bet group
+    worst = [[max(0.0, max(bet_plan.sampler.multipliers) - 1) for bet_plan in plan.bets] for plan in plans]
+
+    # struct-of-arrays player state
+    session = array('i', (names.index(name) for name in rng.choices(names, weights, k=players)))
+    start = array('d', (bankroll[names[s]] if isinstance(bankroll, dict) else bankroll for s in session))
+    cash = array('d', start)
+    loss = array('d', bytes(8 * players))
+    win = array('d', bytes(8 * players))
+    for p in range(players):
+        loss[p], win[p] = plans[session[p]].thresholds(start[p])
+    group = array('i', [-1]) * players
+    remaining = array('i', bytes(4 * players))
+    size = array('d', bytes(8 * players))
+    stake = array('d', bytes(8 * players))
+    bets = array('i', bytes(4 * players))
+    stop = array('b', [PLAYING]) * players
+
+    queue = [(random() * arrival_window, p, PLACE) for p in range(players)]
+    heapq.heapify(queue)
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    pnl = 0.0
+    min_pnl = 0.0
+    exposure = 0.0
+    peak_exposure = 0.0
+    peak_time = 0.0
+    open_bets = 0
+    ruin_time = None
+    skipped = 0
+    refused = 0
+    now = 0.0
+
+    curve_time, curve_pnl, curve_exposure, curve_open = [], [], [], []
+    next_report = 0.0
+
+    while queue:
+        now, p, kind = pop(queue)
+        while now >= next_report:
+            curve_time.append(next_report)
+            curve_pnl.append(pnl)
+            curve_exposure.append(exposure)
+            curve_open.append(open_bets)
+            next_report += report_interval
+
+        s = session[p]
+        g = group[p]
+
+        if kind == SETTLE:
+            bet_plan = plans[s].bets[g]
+            bet = stake[p]
+            payment = bet * bet_plan.sampler.multipliers[bet_plan.sampler.draw(random())]
+            cash[p] += payment
+            bets[p] += 1
+            pnl += bet - payment
+            exposure -= bet * worst[s][g]
+            open_bets -= 1
+            if pnl < min_pnl:
+                min_pnl = pnl
+                if ruin_time is None and house_bankroll + pnl <= 0:
+                    ruin_time = now
+            push(queue, (now + expovariate(1.0 / bet_interval), p, PLACE))
+            continue
+
+        # PLACE: the next bet of the session, as in _play_session
+        plan = plans[s]
+        while True:
+            if remaining[p] == 0:
+                g += 1
+                if g == len(plan.bets):
+                    stop[p] = STOP_COMPLETED
+                    break
+                bet_plan = plan.bets[g]
+                # capped at the table maximum before any check, so a size
+                # above both the bankroll and 'max-bet' is still played
+                size[p] = min(bet_plan.size if bet_plan.percent is None else cash[p] * bet_plan.percent,
+                              limits[s][g][1])
+                remaining[p] = randint(bet_plan.min_quantity, bet_plan.max_quantity)
+                continue
+
+            bankroll_now = cash[p]
+            if bankroll_now <= loss[p]:
+                stop[p] = STOP_LOSS
+                break
+            if bankroll_now >= win[p]:
+                stop[p] = STOP_WIN
+                break
+
+            # the size and the bankroll stay the same until a bet is placed,
+            # so a bet skipped or under the table minimum means the rest of
+            # the group is too
+            bet = size[p]
+            if bet > bankroll_now:
+                skipped += remaining[p]
+                remaining[p] = 0
+                continue
+            liability = bet * worst[s][g]
+            if bet < limits[s][g][0]:
+                refused += remaining[p]
+                remaining[p] = 0
+                continue
+            if exposure + liability > max_exposure:
+                # only this bet is refused: exposure falls as other bets
+                # settle, so the player tries the next one after a think time
+                refused += 1
+                remaining[p] -= 1
+                push(queue, (now + expovariate(1.0 / bet_interval), p, PLACE))
+                break
+
+            remaining[p] -= 1
+            cash[p] = bankroll_now - bet
+            stake[p] = bet
+            exposure += liability
+            open_bets += 1
+            if exposure > peak_exposure:
+                peak_exposure = exposure
+                peak_time = now
+            push(queue, (now + round_time, p, SETTLE))
+            break
+        group[p] = g
+
+    curve_time.append(now)
+    curve_pnl.append(pnl)
+    curve_exposure.append(exposure)
+    curve_open.append(open_bets)
+
+    start_array = np.frombuffer(start, dtype=np.float64)
+    cash_array = np.frombuffer(cash, dtype=np.float64)
+    stop_counts = np.bincount(np.frombuffer(stop, dtype=np.int8), minlength=len(STOP_REASONS))
+    session_counts = np.bincount(np.frombuffer(session, dtype=np.int32), minlength=len(names))
+
+    return {
+        'house': {
+            'start-bankroll': house_bankroll,
+            'final-pnl': pnl,
+            'min-pnl': min_pnl,
+            'peak-exposure': peak_exposure,
+            'peak-exposure-time': peak_time,
+            'ruined': ruin_time is not None,
+            'ruin-time': ruin_time,
+        },
+        'curve': {
+            'time': np.array(curve_time),
+            'pnl': np.array(curve_pnl),
+            'exposure': np.array(curve_exposure),
+            'open-bets': np.array(curve_open, dtype=np.int64),
+        },
+        'players': {
+            'count': players,
+            'bets': int(np.frombuffer(bets, dtype=np.int32).sum()),
+            'skipped-bets': skipped,
+            'refused-bets': refused,
+            'stop-reasons': {reason: int(count) for reason, count in zip(STOP_REASONS, stop_counts)},
+            'mean-profit': float((cash_array - start_array).mean()) if players else math.nan,
+            'sessions': {name: int(count) for name, count in zip(names, session_counts)},
+            'duration': now,
+        },
+    }
+
+
+def _floor_replication(task: tuple) -> dict:
+    sessions_dir, games_dir, players, house_bankroll, seed, replication, options = task
+    floor = play_floor(sessions_dir, games_dir, players, house_bankroll, rng=spawn_rng(seed, replication), **options)
+    return floor['house']
+
+
+def floor_risk(sessions_dir: str, games_dir: str, players: int, house_bankroll: float, replications: int,
+               seed=0, workers: int = None, **options) -> dict:
+    """
+    House risk of ruin over independent replications of a floor.
+
+    Replication i plays play_floor with spawn_rng(seed, i), so the estimate
+    does not depend on the worker count.
+
+    Args:
+        replications: Number of floors played
+        seed: Seed of the replications
+        workers: Number of worker processes (None uses every core, 1 runs inline)
+        options: Keyword arguments forwarded to play_floor
+
+    Returns:
+        Dict with 'replications', 'ruined' (count), 'ruin-probability' and
+        its 95% Agresti-Coull 'ci', and per replication NumPy arrays
+        'final-pnl', 'min-pnl' and 'peak-exposure'
+    """
+    if replications < 1:
+        raise ValueError("replications must be at least 1")
+
+    tasks = [
+        (sessions_dir, games_dir, players, house_bankroll, seed, i, options)
+        for i in range(replications)
+    ]
+    if workers == 1:
+        houses = [_floor_replication(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            houses = list(executor.map(_floor_replication, tasks))
+
+    ruined = sum(1 for house in houses if house['ruined'])
+    z2 = Z_95 * Z_95
+    center = (ruined + z2 / 2) / (replications + z2)
+    half_width = Z_95 * math.sqrt(center * (1 - center) / (replications + z2))
+    return {
+        'replications': replications,
+        'ruined': ruined,
+        'ruin-probability': ruined / replications,
+        'ci': (max(0.0, center - half_width), min(1.0, center + half_width)),
+        'final-pnl': np.array([house['final-pnl'] for house in houses]),
+        'min-pnl': np.array([house['min-pnl'] for house in houses]),
+        'peak-exposure': np.array([house['peak-exposure'] for house in houses]),
+    }
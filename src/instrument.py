@@ -0,0 +1,203 @@
+import json
+import time
+from functools import partial
+from contextlib import contextmanager
+
+# The recorder collecting the current measurements, None when instrumentation
+# is off. Instrumented code reads it once and does nothing else when it is
+# None, so the disabled cost is an attribute load per lookup or session and
+# nothing per bet.
+active = None
+
+
+class Recorder:
+    """
+    Measurements of an instrumented block (see recording).
+
+    - timers: phase -> (calls, seconds), e.g. 'lookup', 'validate', 'plan',
+      'rng', 'session', 'write', 'ev'
+    - counters: name -> count, e.g. 'runs', 'sessions', 'bets',
+      'skipped-bets' (bet_size > bankroll) and 'stop-reason:<reason>'
+    - caches: name -> (hits, misses), e.g. 'registry-files', 'validation',
+      'sampler', 'session-plan', 'simulation-plan'
+
+    Hooks are called as hook(event, data) after every timed phase
+    ('phase', with 'name' and 'seconds') and every session ('session',
+    with 'stop-reason', 'bets', 'skipped-bets' and 'seconds'). They only
+    run in the process that registered them, never in batch workers.
+    """
+
+    def __init__(self, hooks=()):
+        self.timers = {}
+        self.counters = {}
+        self.caches = {}
+        self.hooks = list(hooks)
+
+    def add_time(self, phase: str, seconds: float, calls: int = 1) -> None:
+        timer = self.timers.get(phase)
+        if timer is None:
+            self.timers[phase] = [calls, seconds]
+        else:
+            timer[0] += calls
+            timer[1] += seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def cache(self, name: str, hit: bool) -> None:
+        cache = self.caches.get(name)
+        if cache is None:
+            cache = self.caches[name] = [0, 0]
+        cache[0 if hit else 1] += 1
+
+    def emit(self, event: str, data: dict) -> None:
+        for hook in self.hooks:
+            hook(event, data)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.add_time(name, seconds)
+            if self.hooks:
+                self.emit('phase', {'name': name, 'seconds': seconds})
+
+    def session(self, stop_reason: str, bets: int, skipped: int, seconds: float) -> None:
+        """Records one session played by the engine."""
+        self.add_time('session', seconds)
+        self.count('sessions')
+        self.count('bets', bets)
+        if skipped:
+            self.count('skipped-bets', skipped)
+        self.count(f"stop-reason:{stop_reason}")
+        if self.hooks:
+            self.emit('session', {'stop-reason': stop_reason, 'bets': bets, 'skipped-bets': skipped, 'seconds': seconds})
+
+    def merge(self, other: 'Recorder') -> None:
+        """Adds the measurements of another recorder, e.g. a batch worker's."""
+        for phase, (calls, seconds) in other.timers.items():
+            self.add_time(phase, seconds, calls)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        for name, (hits, misses) in other.caches.items():
+            cache = self.caches.setdefault(name, [0, 0])
+            cache[0] += hits
+            cache[1] += misses
+
+    def to_dict(self) -> dict:
+        """
+        JSON-ready summary: 'timers' (phase -> 'calls', 'seconds',
+        'mean-us'), 'counters' and 'caches' (name -> 'hits', 'misses',
+        'hit-rate').
+        """
+        return {
+            'timers': {
+                phase: {'calls': calls, 'seconds': seconds, 'mean-us': seconds / calls * 1e6 if calls else 0.0}
+                for phase, (calls, seconds) in sorted(self.timers.items())
+            },
+            'counters': dict(sorted(self.counters.items())),
+            'caches': {
+                name: {'hits': hits, 'misses': misses, 'hit-rate': hits / (hits + misses) if hits + misses else None}
+                for name, (hits, misses) in sorted(self.caches.items())
+            },
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def __getstate__(self) -> dict:
+        # hooks are usually closures; workers send back measurements only
+        state = self.__dict__.copy()
+        state['hooks'] = []
+        return state
+
+
+@contextmanager
+def recording(hooks=(), recorder: Recorder = None):
+    """
+    Turns instrumentation on for the duration of the block.
+
+    Example:
+        with recording() as recorder:
+            run_batch(...)
+        recorder.write_json('profile.json')
+
+    Args:
+        hooks: Callables receiving (event, data), see Recorder
+        recorder: Recorder to add to, instead of a new one
+
+    Yields:
+        Recorder: The measurements, complete once the block exits
+    """
+    global active
+    previous = active
+    active = Recorder(hooks) if recorder is None else recorder
+    try:
+        yield active
+    finally:
+        active = previous
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_PHASE = _NoPhase()
+
+def phase(name: str):
+    """Context manager timing a phase, a shared no-op when instrumentation is off."""
+    if active is None:
+        return _NO_PHASE
+    return active.phase(name)
+
+def cache_event(name: str, hit: bool) -> None:
+    if active is not None:
+        active.cache(name, hit)
+
+
+class _Collected:
+    """Result of a batch task together with the worker's measurements."""
+
+    __slots__ = ('result', 'recorder')
+
+    def __init__(self, result, recorder: Recorder):
+        self.result = result
+        self.recorder = recorder
+
+    def __getstate__(self):
+        return self.result, self.recorder
+
+    def __setstate__(self, state):
+        self.result, self.recorder = state
+
+def _collect(function, task):
+    with recording() as recorder:
+        result = function(task)
+    return _Collected(result, recorder)
+
+def wrap(function):
+    """
+    Task function for a process pool: when instrumentation is on, each task
+    runs under its own Recorder in the worker and is sent back with it (see
+    unwrap); otherwise the function itself.
+    """
+    if active is None:
+        return function
+    return partial(_collect, function)
+
+def unwrap(result):
+    """Merges the measurements of a wrapped task into the active recorder and returns its result."""
+    if isinstance(result, _Collected):
+        if active is not None:
+            active.merge(result.recorder)
+        return result.result
+    return result
@@ -0,0 +1,192 @@
+import json
+from collections import OrderedDict
+from .finder import get_registry, find_session_by_name, find_simulation_by_name, is_registry_item
+from .schema_validator import validate_game_schema, validate_session_schema
+from .sampler import get_sampler
+from . import instrument
+
+
+class BetPlan:
+    """
+    One bet group of a session, with its outcome table already resolved.
+
+    Exactly one of 'size' (fixed bet) and 'percent' (fraction of the bankroll
+    when the group starts) is set.
+    """
+
+    __slots__ = ('game', 'bet_type', 'sampler', 'size', 'percent', 'min_quantity', 'max_quantity')
+
+    def __init__(self, bet_config: dict, games_dir: str):
+        self.game = bet_config['game']
+        self.bet_type = bet_config.get('bet-type')
+        self.sampler = get_sampler(games_dir, self.game, self.bet_type)
+        self.size = bet_config.get('bet-size')
+        self.percent = None if 'bet-size' in bet_config else bet_config['bet-percent']
+        self.min_quantity = bet_config.get('min-quantity', 1)
+        self.max_quantity = bet_config.get('max-quantity', self.min_quantity)
+
+
+class SessionPlan:
+    """
+    Flat, compiled form of a session configuration.
+
+    The four optional stop conditions fold into a loss and a win threshold
+    per starting bankroll (see thresholds), so the bet loop only compares
+    two numbers.
+    """
+
+    __slots__ = ('config', 'name', 'bets', 'loss_size', 'loss_percent', 'win_size', 'gain_percent')
+
+    def __init__(self, session_config: dict, games_dir: str):
+        self.config = session_config
+        self.name = session_config.get('name')
+        self.bets = tuple(BetPlan(bet_config, games_dir) for bet_config in session_config['bets'])
+        self.loss_size = session_config.get('stop-loss-size')
+        self.loss_percent = session_config.get('stop-loss-percent')
+        self.win_size = session_config.get('stop-win-size')
+        self.gain_percent = session_config.get('stop-gain-percent')
+
+    def thresholds(self, initial_bankroll: float, maximum=max, minimum=min) -> tuple:
+        """
+        Returns (loss, win): the session stops before a bet when
+        'bankroll <= loss' (checked first) or 'bankroll >= win'.
+
+        The vectorized engine passes an array of initial bankrolls with
+        np.maximum and np.minimum; a threshold without any stop condition
+        stays a scalar infinity.
+        """
+        loss = -float('inf')
+        win = float('inf')
+        if self.loss_size is not None:
+            loss = maximum(loss, initial_bankroll - self.loss_size)
+        if self.loss_percent is not None:
+            loss = maximum(loss, initial_bankroll * (1 - self.loss_percent))
+        if self.win_size is not None:
+            win = minimum(win, initial_bankroll + self.win_size)
+        if self.gain_percent is not None:
+            win = minimum(win, initial_bankroll * (1 + self.gain_percent))
+        return loss, win
+
+
+class SimulationPlan:
+    """
+    Compiled action list of a simulation.
+
+    Each action is a tuple: ('play', session name, SessionPlan),
+    ('withdraw', size) or ('aport', size).
+    """
+
+    __slots__ = ('config', 'name', 'start_bankroll', 'actions')
+
+    def __init__(self, sim_config: dict, sessions_dir: str, games_dir: str, sessions: dict = None):
+        self.config = sim_config
+        self.name = sim_config.get('name')
+        self.start_bankroll = sim_config['start-bankroll']
+
+        actions = []
+        for action in sim_config['actions']:
+            action_type = action['type']
+            if action_type == 'play':
+                session_name = action['name']
+                if sessions is not None and session_name in sessions:
+                    session_config = sessions[session_name]
+                else:
+                    session_config = find_session_by_name(sessions_dir, session_name)
+                actions.append(('play', session_name, get_session_plan(session_config, games_dir)))
+            elif action_type in ('withdraw', 'aport'):
+                actions.append((action_type, action['size']))
+        self.actions = tuple(actions)
+
+
+# Compiled plans, least recently used first. Configurations loaded by a
+# registry are keyed by identity: the registry replaces them instead of
+# changing them, and a cached plan holds its dict, so the id cannot be reused
+# while the entry lives. Dicts built by callers (sweep variants, the
+# 'sessions' argument of play_simulation) may be changed in place and are
+# keyed by content instead. Entries also record the registry items they
+# were resolved from (sessions and games) and recompile as soon as a lookup
+# returns a different one, i.e. when one of those files changed.
+PLAN_CACHE_SIZE = 256
+
+_session_plans = OrderedDict()
+_simulation_plans = OrderedDict()
+
+def _config_key(config):
+    if config is None:
+        return None
+    if is_registry_item(config):
+        return id(config)
+    return json.dumps(config, sort_keys=True, separators=(',', ':'))
+
+def _game_dependencies(session_config: dict, games_dir: str) -> list:
+    registry = get_registry(games_dir, validate_game_schema)
+    return [
+        (registry, game, registry.get(game))
+        for game in dict.fromkeys(bet_config['game'] for bet_config in session_config['bets'])
+    ]
+
+def _is_current(dependencies: tuple) -> bool:
+    for registry, name, item in dependencies:
+        try:
+            if registry.get(name) is not item:
+                return False
+        except ValueError:
+            return False
+    return True
+
+def _cache_get(cache: OrderedDict, key):
+    cached = cache.get(key)
+    if cached is None or not _is_current(cached[0]):
+        return None
+    cache.move_to_end(key)
+    return cached[1]
+
+def _cache_put(cache: OrderedDict, key, dependencies: list, plan) -> None:
+    cache[key] = (tuple(dependencies), plan)
+    cache.move_to_end(key)
+    while len(cache) > PLAN_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def get_session_plan(session_config: dict, games_dir: str) -> SessionPlan:
+    """Returns the compiled plan of a session configuration dict."""
+    key = (_config_key(session_config), games_dir)
+    plan = _cache_get(_session_plans, key)
+    instrument.cache_event('session-plan', plan is not None)
+    if plan is not None:
+        return plan
+
+    # resolved before compiling, so a file changing meanwhile recompiles next time
+    dependencies = _game_dependencies(session_config, games_dir)
+    plan = SessionPlan(session_config, games_dir)
+    _cache_put(_session_plans, key, dependencies, plan)
+    return plan
+
+def get_simulation_plan(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str,
+                        sessions: dict = None) -> SimulationPlan:
+    """
+    Returns the compiled plan of a simulation.
+
+    Args:
+        sessions: Optional session name -> configuration mapping, used
+            instead of the matching files of sessions_dir
+    """
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+
+    key = (id(sim_config), sessions_dir, games_dir, _config_key(sessions))
+    plan = _cache_get(_simulation_plans, key)
+    instrument.cache_event('simulation-plan', plan is not None)
+    if plan is not None:
+        return plan
+
+    registry = get_registry(sessions_dir, validate_session_schema)
+    dependencies = []
+    for session_name in dict.fromkeys(action['name'] for action in sim_config['actions'] if action['type'] == 'play'):
+        if sessions is not None and session_name in sessions:
+            session_config = sessions[session_name]
+        else:
+            session_config = registry.get(session_name)
+            dependencies.append((registry, session_name, session_config))
+        dependencies += _game_dependencies(session_config, games_dir)
+    plan = SimulationPlan(sim_config, sessions_dir, games_dir, sessions)
+    _cache_put(_simulation_plans, key, dependencies, plan)
+    return plan
@@ -1,37 +1,123 @@
-from .finder import find_game_by_name, find_simulation_by_name
-import secrets
-    
-def play_game(games_dir:str,game:str,bet_type:str,amount:float)->dict:
-    found_game = find_game_by_name(games_dir,game)
-    
-    if found_game['multi-bet-type'] and not bet_type:
-        raise ValueError("these game requires a bet type")
-
-    if found_game['multi-bet-type']:
-        try:
-            possible_results = found_game['bet-types'][bet_type]['possible-results']
-        except:
-            raise ValueError(f"Bet type '{bet_type}' not found in game '{game}'")
-    else:
-        possible_results = found_game['possible-results']
+from .sampler import get_sampler
+from .plan import get_session_plan, get_simulation_plan
+from .rng import make_rng
+from time import perf_counter
+from . import instrument
+
+# Why a session ended; the batch engines report these as indexes into the tuple.
+STOP_REASONS = ('completed', 'stop-loss', 'stop-win')
+
+# How much of a run is recorded: every bet, one summary per session, or only the totals.
+TRACE_NONE = 'none'
+TRACE_SESSION = 'session'
+TRACE_BET = 'bet'
+TRACE_LEVELS = (TRACE_NONE, TRACE_SESSION, TRACE_BET)
+
+# Bump whenever the same configurations and seed would play differently, so
+# cached batches (see src/cache.py) from the previous engine are not reused.
+ENGINE_VERSION = 1
     
+def play_game(games_dir:str,game:str,bet_type:str,amount:float,rng=None)->dict:
+    sampler = get_sampler(games_dir,game,bet_type)
     
     ## make a sorteio from 0 to 1 
-    sorteio = secrets.SystemRandom().random()
-    acumulated = 0
-    for result in possible_results:
-        if sorteio <= acumulated + result['chance']:
-            return {
-                "result":result['name'],    
-                "payment":amount*result['multiplier']
-                }
-        acumulated += result['chance']
+    index = sampler.draw(make_rng(rng).random())
     return {
-        "result":"loss",
-        "payment":0
-    }
+        "result":sampler.names[index],
+        "payment":amount*sampler.multipliers[index]
+        }
+
+def _play_session(plan,bankroll:float,rng,results:list,tilt=None,weight:float=1.0)->tuple:
+    """
+    Plays one session from its compiled plan (see get_session_plan).
+
+    Bets are appended to 'results' as dicts, unless it is None, in which case
+    nothing is allocated per bet. With a Tilt, outcomes are drawn from the
+    tilted tables and the likelihood ratio of every draw is multiplied into
+    'weight', the run's weight when the session starts.
+
+    Returns:
+        (bankroll, min_bankroll, bets, stop_reason, weight)
+    """
+    recorder = instrument.active
+    if recorder is not None:
+        started = perf_counter()
+        skipped = 0
+
+    min_bankroll = bankroll
+    bets = 0
+    stop_reason = 'completed'
+
+    # Stop conditions, relative to the bankroll the session starts with
+    loss_threshold, win_threshold = plan.thresholds(bankroll)
+    random = rng.random
+
+    # Process each bet group
+    for bet_plan in plan.bets:
+        sampler = bet_plan.sampler
+        ratios = None
+        if tilt is not None:
+            sampler, ratios = tilt.compile(bet_plan.game, sampler)
+        draw = sampler.draw
+        multipliers = sampler.multipliers
+
+        # Fixed size, or a percentage of the bankroll when the group starts
+        if bet_plan.percent is None:
+            bet_size = bet_plan.size
+        else:
+            bet_size = bankroll * bet_plan.percent
+
+        # Random quantity between min and max
+        quantity = rng.randint(bet_plan.min_quantity, bet_plan.max_quantity)
+
+        # Place bets
+        for _ in range(quantity):
+            if bankroll <= loss_threshold:
+                stop_reason = 'stop-loss'
+                break
+            if bankroll >= win_threshold:
+                stop_reason = 'stop-win'
+                break
+
+            # Skip bet if bankroll is insufficient
+            if bet_size > bankroll:
+                if recorder is not None:
+                    skipped += 1
+                continue
+
+            # Deduct the bet, play it and add the payment
+            bankroll -= bet_size
+            index = draw(random())
+            payment = bet_size * multipliers[index]
+            bankroll += payment
+            bets += 1
+            if ratios is not None:
+                weight *= ratios[index]
+            if bankroll < min_bankroll:
+                min_bankroll = bankroll
+
+            # Record the result
+            if results is not None:
+                bet = {
+                    'game': bet_plan.game,
+                    'bet-type': bet_plan.bet_type,
+                    'bet-size': bet_size,
+                    'result': sampler.names[index],
+                    'payment': payment,
+                    'bankroll': bankroll
+                }
+                if tilt is not None:
+                    bet['weight'] = weight
+                results.append(bet)
 
-def play_session(sessions_dir:str,games_dir:str,session:str,bankroll:float)->dict:
+        if stop_reason != 'completed':
+            break
+
+    if recorder is not None:
+        recorder.session(stop_reason, bets, skipped, perf_counter() - started)
+    return bankroll, min_bankroll, bets, stop_reason, weight
+
+def play_session(sessions_dir:str,games_dir:str,session:str,bankroll:float,rng=None,trace:str=TRACE_BET,tilt=None):
     """
     Plays a complete session with stop-loss and stop-gain checks.
     
@@ -40,9 +126,14 @@ def play_session(sessions_dir:str,games_dir:str,session:str,bankroll:float)->dic
         games_dir: Directory containing game configurations
         session: Name of the session to play
         bankroll: Initial bankroll amount
+        rng: Optional seed or random.Random generator (see make_rng)
+        trace: 'bet' to record every bet, 'session' or 'none' for a summary only
+        tilt: Optional Tilt to draw outcomes from (rare-event mode)
         
     Returns:
-        List of bet results with game, bet-type, bet-size, result, payment, and bankroll
+        With trace 'bet': list of bet results with game, bet-type, bet-size, result, payment, and bankroll
+        Otherwise: dict with bankroll, min-bankroll, bets and stop-reason (one of STOP_REASONS)
+        With a tilt, every bet and the summary also carry the running likelihood-ratio 'weight'
         
     The session terminates when:
     - Stop-loss is hit (bankroll <= initial_bankroll - stop-loss-size or bankroll <= initial_bankroll * (1 - stop-loss-percent))
@@ -52,125 +143,134 @@ def play_session(sessions_dir:str,games_dir:str,session:str,bankroll:float)->dic
     """
     from .finder import find_session_by_name
     
+    if trace not in TRACE_LEVELS:
+        raise ValueError(f"Unknown trace level '{trace}', expected one of {TRACE_LEVELS}")
+
     # Load session configuration
-    session_config = find_session_by_name(sessions_dir, session)
-    
-    # Store initial bankroll for stop-loss/stop-gain calculations
-    initial_bankroll = bankroll
+    with instrument.phase('plan'):
+        plan = get_session_plan(find_session_by_name(sessions_dir, session), games_dir)
+    with instrument.phase('rng'):
+        rng = make_rng(rng)
     
-    # Extract stop conditions
-    stop_loss_size = session_config.get('stop-loss-size')
-    stop_win_size = session_config.get('stop-win-size')
-    stop_loss_percent = session_config.get('stop-loss-percent')
-    stop_gain_percent = session_config.get('stop-gain-percent')
-    
-    # Results list
-    results = []
-    
-    # Process each bet configuration
-    for bet_config in session_config['bets']:
-        game_name = bet_config['game']
-        bet_type = bet_config.get('bet-type')
-        
-        # Determine bet size
-        if 'bet-size' in bet_config:
-            bet_size = bet_config['bet-size']
-        else:
-            # Calculate bet size from percentage
-            bet_percent = bet_config['bet-percent']
-            bet_size = bankroll * bet_percent
-        
-        # Determine how many times to place this bet
-        min_quantity = bet_config.get('min-quantity', 1)
-        max_quantity = bet_config.get('max-quantity', min_quantity)
-        
-        # Random quantity between min and max
-        quantity = secrets.SystemRandom().randint(min_quantity, max_quantity)
-        
-        # Place bets
-        for _ in range(quantity):
-            # Check stop-loss conditions
-            if stop_loss_size is not None:
-                if bankroll <= initial_bankroll - stop_loss_size:
-                    return results
-            
-            if stop_loss_percent is not None:
-                if bankroll <= initial_bankroll * (1 - stop_loss_percent):
-                    return results
-            
-            # Check stop-gain conditions
-            if stop_win_size is not None:
-                if bankroll >= initial_bankroll + stop_win_size:
-                    return results
-            
-            if stop_gain_percent is not None:
-                if bankroll >= initial_bankroll * (1 + stop_gain_percent):
-                    return results
-            
-            # Skip bet if bankroll is insufficient
-            if bet_size > bankroll:
-                continue
-            
-            # Deduct bet from bankroll
-            bankroll -= bet_size
-            
-            # Play the game
-            game_result = play_game(games_dir, game_name, bet_type, bet_size)
-            
-            # Add payment to bankroll
-            bankroll += game_result['payment']
-            
-            # Record the result
-            results.append({
-                'game': game_name,
-                'bet-type': bet_type,
-                'bet-size': bet_size,
-                'result': game_result['result'],
-                'payment': game_result['payment'],
-                'bankroll': bankroll
-            })
+    if trace == TRACE_BET:
+        results = []
+        _play_session(plan, bankroll, rng, results, tilt)
+        return results
+
+    bankroll, min_bankroll, bets, stop_reason, weight = _play_session(plan, bankroll, rng, None, tilt)
+    summary = {
+        'bankroll': bankroll,
+        'min-bankroll': min_bankroll,
+        'bets': bets,
+        'stop-reason': stop_reason
+    }
+    if tilt is not None:
+        summary['weight'] = weight
+    return summary
+
+def play_simulation(simulations_dir:str,sessions_dir:str,games_dir:str,simulation:str,rng=None,trace:str=TRACE_BET,sessions:dict=None,tilt=None):
+    """
+    Plays every action of a simulation, carrying the bankroll between them.
+
+    Args:
+        simulations_dir: Directory containing simulation configurations
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        simulation: Name of the simulation to play
+        rng: Optional seed or random.Random generator (see make_rng)
+        trace: 'bet' records every bet of every session, 'session' one
+            summary per action, 'none' only the simulation summary
+        sessions: Optional session name -> configuration mapping, used
+            instead of the matching files of sessions_dir
+        tilt: Optional Tilt to draw outcomes from (rare-event mode)
 
-    return results
+    Returns:
+        With trace 'bet' or 'session': list with one dict per action
+        With trace 'none': dict with bankroll, min-bankroll, bets and the
+        stop-reason of the last session played
+        With a tilt, every action dict (and the summary) also carries the
+        run's likelihood-ratio 'weight' so far
+    """
+    if trace not in TRACE_LEVELS:
+        raise ValueError(f"Unknown trace level '{trace}', expected one of {TRACE_LEVELS}")
 
-def play_simulation(simulations_dir:str,sessions_dir:str,games_dir:str,simulation:str)->list:
-    sim_config = find_simulation_by_name(simulations_dir, simulation)
-    bankroll = sim_config['start-bankroll']
+    with instrument.phase('plan'):
+        plan = get_simulation_plan(simulations_dir, sessions_dir, games_dir, simulation, sessions)
+    with instrument.phase('rng'):
+        rng = make_rng(rng)
+    if instrument.active is not None:
+        instrument.active.count('runs')
+    bankroll = plan.start_bankroll
+    min_bankroll = bankroll
+    total_bets = 0
+    stop_reason = 'completed'
+    weight = 1.0
 
-    results = []
+    results = [] if trace != TRACE_NONE else None
 
-    for action in sim_config['actions']:
-        action_type = action['type']
+    for action in plan.actions:
+        action_type = action[0]
 
         if action_type == 'play':
-            session_name = action['name']
-            session_result = play_session(sessions_dir, games_dir, session_name, bankroll)
+            _, session_name, session_plan = action
+            session_result = [] if trace == TRACE_BET else None
 
-            if session_result:
-                bankroll = session_result[-1]['bankroll']
+            bankroll, session_min, bets, stop_reason, weight = _play_session(
+                session_plan, bankroll, rng, session_result, tilt, weight
+            )
+            min_bankroll = min(min_bankroll, session_min)
+            total_bets += bets
 
-            results.append({
-                'type': 'play',
-                'name': session_name,
-                'bets': session_result,
-                'bankroll': bankroll
-            })
+            if trace == TRACE_BET:
+                results.append({
+                    'type': 'play',
+                    'name': session_name,
+                    'bets': session_result,
+                    'bankroll': bankroll
+                })
+            elif trace == TRACE_SESSION:
+                results.append({
+                    'type': 'play',
+                    'name': session_name,
+                    'bet-count': bets,
+                    'min-bankroll': session_min,
+                    'stop-reason': stop_reason,
+                    'bankroll': bankroll
+                })
 
         elif action_type == 'withdraw':
-            size = action['size']
+            size = action[1]
             bankroll -= size
-            results.append({
-                'type': 'withdraw',
-                'size': size,
-                'bankroll': bankroll
-            })
+            min_bankroll = min(min_bankroll, bankroll)
+            if results is not None:
+                results.append({
+                    'type': 'withdraw',
+                    'size': size,
+                    'bankroll': bankroll
+                })
 
         elif action_type == 'aport':
-            size = action['size']
+            size = action[1]
             bankroll += size
-            results.append({
-                'type': 'aport',
-                'size': size,
-                'bankroll': bankroll
-            })
+            if results is not None:
+                results.append({
+                    'type': 'aport',
+                    'size': size,
+                    'bankroll': bankroll
+                })
+
+        if tilt is not None and results:
+            results[-1]['weight'] = weight
 
-    return results
\ No newline at end of file
+    if results is not None:
+        return results
+
+    summary = {
+        'bankroll': bankroll,
+        'min-bankroll': min_bankroll,
+        'bets': total_bets,
+        'stop-reason': stop_reason
+    }
+    if tilt is not None:
+        summary['weight'] = weight
+    return summary
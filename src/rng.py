@@ -0,0 +1,77 @@
+import hashlib
+import random
+
+
+def make_rng(rng=None) -> random.Random:
+    """
+    Resolves the 'rng' argument accepted by the play functions.
+
+    Args:
+        rng: None for a fresh, OS-seeded generator, an int/str seed, or an
+            existing random.Random instance (returned as is)
+
+    Returns:
+        random.Random: Mersenne Twister generator
+    """
+    if rng is None:
+        return random.Random()
+    if isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+
+def substream_seed(seed, stream: int) -> int:
+    """Seed of the substream number 'stream' of 'seed', a hash of both."""
+    digest = hashlib.sha256(f"{seed}:{stream}".encode('utf-8')).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def spawn_rng(seed, stream: int) -> random.Random:
+    """
+    Returns the independent substream number 'stream' of 'seed'.
+
+    The substream seed is a hash of (seed, stream), so run i of a batch gets
+    the same draws no matter which process or in which order it is played.
+    """
+    return random.Random(substream_seed(seed, stream))
+
+
+class AntitheticRandom(random.Random):
+    """
+    Mirror image of a random.Random stream: random() returns 1 - u and
+    randint(a, b) returns a + b - k for the draws u, k of the same seed.
+    """
+
+    def random(self) -> float:
+        return 1.0 - super().random()
+
+    def randint(self, a: int, b: int) -> int:
+        return a + b - super().randint(a, b)
+
+    def getrandbits(self, k: int) -> int:
+        # defining getrandbits keeps randint on the bit stream instead of
+        # random(), so both streams consume the same state
+        return super().getrandbits(k)
+
+
+def antithetic_rng(seed, stream: int) -> AntitheticRandom:
+    """Antithetic partner of spawn_rng(seed, stream)."""
+    return AntitheticRandom(substream_seed(seed, stream))
+
+
+def make_generator(rng=None):
+    """
+    NumPy counterpart of make_rng, used by the batch engines.
+
+    Args:
+        rng: None, an int seed, a numpy SeedSequence or an existing
+            numpy.random.Generator (returned as is)
+
+    Returns:
+        numpy.random.Generator: PCG64 generator
+    """
+    import numpy as np
+
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
@@ -0,0 +1,163 @@
+from bisect import bisect_left
+from .finder import find_game_by_name
+from . import instrument
+
+
+class OutcomeSampler:
+    """
+    Compiled outcome table of a game (or of one bet type of a multi-bet game).
+
+    Holds the cumulative chances of 'possible-results' plus parallel name and
+    multiplier tuples. The implicit loss (the probability not covered by the
+    results) is stored as the last entry, so a draw is a single binary search.
+    """
+
+    __slots__ = ('names', 'multipliers', 'chances', 'cumulative', 'loss_index')
+
+    def __init__(self, possible_results: list):
+        names = []
+        multipliers = []
+        cumulative = []
+
+        # accumulate exactly like the linear walk did, so the thresholds
+        # (and therefore the outcome distribution) are bit-for-bit the same
+        acumulated = 0
+        for result in possible_results:
+            names.append(result['name'])
+            multipliers.append(result['multiplier'])
+            cumulative.append(acumulated + result['chance'])
+            acumulated += result['chance']
+
+        self.loss_index = len(names)
+        names.append("loss")
+        multipliers.append(0)
+
+        # probability a uniform draw lands on each entry; results past a
+        # total chance of 1 are truncated, as they are by draw()
+        chances = []
+        previous = 0
+        for threshold in cumulative + [1]:
+            threshold = min(threshold, 1)
+            chances.append(max(0, threshold - previous))
+            previous = max(previous, threshold)
+
+        self.names = tuple(names)
+        self.multipliers = tuple(multipliers)
+        self.chances = tuple(chances)
+        self.cumulative = tuple(cumulative)
+
+    def draw(self, sorteio: float) -> int:
+        """Returns the index of the outcome for a uniform draw in [0, 1)."""
+        return bisect_left(self.cumulative, sorteio)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+_samplers = {}
+
+def get_sampler(games_dir: str, game: str, bet_type: str = None) -> OutcomeSampler:
+    """
+    Returns the compiled sampler of a game/bet-type pair.
+
+    Samplers are compiled once and recompiled only when the game configuration
+    is reloaded from disk.
+    """
+    found_game = find_game_by_name(games_dir, game)
+
+    if found_game['multi-bet-type'] and not bet_type:
+        raise ValueError("these game requires a bet type")
+
+    if not found_game['multi-bet-type']:
+        bet_type = None
+
+    key = (games_dir, game, bet_type)
+    cached = _samplers.get(key)
+    instrument.cache_event('sampler', cached is not None and cached[0] is found_game)
+    if cached is not None and cached[0] is found_game:
+        return cached[1]
+
+    if found_game['multi-bet-type']:
+        try:
+            possible_results = found_game['bet-types'][bet_type]['possible-results']
+        except:
+            raise ValueError(f"Bet type '{bet_type}' not found in game '{game}'")
+    else:
+        possible_results = found_game['possible-results']
+
+    sampler = OutcomeSampler(possible_results)
+    _samplers[key] = (found_game, sampler)
+    return sampler
+
+
+class Tilt:
+    """
+    Importance-sampling proposal over the outcome tables.
+
+    Multiplies the chance of chosen outcomes by a factor and renormalizes.
+    Draws then come from the tilted table, and each one carries the
+    likelihood ratio (true chance / tilted chance) that undoes the bias.
+
+    Args:
+        outcomes: Outcome name -> factor ('loss' is the implicit loss)
+        ruin: Factor applied to every outcome paying back less than the
+            stake (multiplier < 1), which pushes paths toward ruin
+        games: Game names the tilt applies to (default: every game)
+    """
+
+    def __init__(self, outcomes: dict = None, ruin: float = None, games=None):
+        self.outcomes = dict(outcomes or {})
+        self.ruin = ruin
+        self.games = set(games) if games is not None else None
+        self._compiled = {}
+
+        for name, factor in self.outcomes.items():
+            if not factor > 0:
+                raise ValueError(f"Tilt factor of '{name}' must be greater than 0")
+        if ruin is not None and not ruin > 0:
+            raise ValueError("Tilt 'ruin' factor must be greater than 0")
+
+    def compile(self, game: str, sampler: OutcomeSampler) -> tuple:
+        """
+        Returns (tilted sampler, likelihood ratios) for a compiled table, or
+        (sampler, None) when the tilt does not touch it.
+
+        ratios[i] is the weight a draw of outcome i multiplies into the path's
+        likelihood ratio.
+        """
+        key = (game, id(sampler))
+        cached = self._compiled.get(key)
+        if cached is not None and cached[0] is sampler:
+            return cached[1], cached[2]
+
+        factors = [1.0] * len(sampler)
+        if self.games is None or game in self.games:
+            for idx, (name, multiplier) in enumerate(zip(sampler.names, sampler.multipliers)):
+                factors[idx] = self.outcomes.get(name, 1.0)
+                if self.ruin is not None and multiplier < 1:
+                    factors[idx] *= self.ruin
+
+        if all(factor == 1.0 for factor in factors):
+            tilted, ratios = sampler, None
+        else:
+            weights = [chance * factor for chance, factor in zip(sampler.chances, factors)]
+            total = sum(weights)
+
+            # the tilted loss is again whatever the results leave uncovered
+            tilted = OutcomeSampler([
+                {'name': name, 'chance': weight / total, 'multiplier': multiplier}
+                for name, weight, multiplier in zip(sampler.names, weights, sampler.multipliers)
+            ][:sampler.loss_index])
+            ratios = tuple(
+                chance / tilted_chance if tilted_chance > 0 else 0.0
+                for chance, tilted_chance in zip(sampler.chances, tilted.chances)
+            )
+
+        self._compiled[key] = (sampler, tilted, ratios)
+        return tilted, ratios
+
+    def __getstate__(self) -> dict:
+        # compiled tables are keyed by object identity, which does not survive pickling
+        state = self.__dict__.copy()
+        state['_compiled'] = {}
+        return state
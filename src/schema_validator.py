@@ -1,231 +1,183 @@
+import os
+import json
+import hashlib
+
+ACTION_TYPES = ('play', 'withdraw', 'aport')
+
+
 def validate_game_schema(game: dict) -> bool:
     """
     Validates game schema for both single-bet and multi-bet-type games.
-    
+
     Args:
         game: Dictionary containing game configuration
-        
+
     Returns:
         bool: True if schema is valid
-        
+
     Raises:
         ValueError: If schema validation fails with detailed error message
     """
-    # Check required base fields
-    if not isinstance(game, dict):
-        raise ValueError("Game must be a dictionary")
-    
-    if "name" not in game:
-        raise ValueError("Game must have a 'name' field")
-    
-    if not isinstance(game["name"], str) or not game["name"].strip():
-        raise ValueError("Game 'name' must be a non-empty string")
-    
+    for path, message in _game_errors(game):
+        raise ValueError(message)
+    return True
+
+
+def _name_errors(item, kind: str):
+    """Errors of the part every configuration shares: a dict with a non-empty 'name'."""
+    if not isinstance(item, dict):
+        yield '$', f"{kind} must be a dictionary"
+    elif "name" not in item:
+        yield '$', f"{kind} must have a 'name' field"
+    elif not isinstance(item["name"], str) or not item["name"].strip():
+        yield '$.name', f"{kind} 'name' must be a non-empty string"
+
+
+def _game_errors(game):
+    """
+    Yields (JSON path, message) for every problem of a game, in the order
+    validate_game_schema checks them.
+    """
+    errors = list(_name_errors(game, "Game"))
+    if errors:
+        yield from errors
+        return
+
     if "multi-bet-type" not in game:
-        raise ValueError(f"Game '{game['name']}' must have a 'multi-bet-type' field")
-    
+        yield '$', f"Game '{game['name']}' must have a 'multi-bet-type' field"
+        return
+
     if not isinstance(game["multi-bet-type"], bool):
-        raise ValueError(f"Game '{game['name']}' 'multi-bet-type' must be a boolean")
-    
+        yield '$.multi-bet-type', f"Game '{game['name']}' 'multi-bet-type' must be a boolean"
+        return
+
     # Validate based on game type
     if game["multi-bet-type"]:
-        _validate_multi_bet_game(game)
+        yield from _multi_bet_game_errors(game)
     else:
-        _validate_single_bet_game(game)
-    
-    return True
+        yield from _single_bet_game_errors(game)
 
 
-def _validate_multi_bet_game(game: dict) -> None:
+def _multi_bet_game_errors(game: dict):
     """
-    Validates multi-bet-type games (e.g., Baccarat).
-
-    Each bet type must contain a 'possible-results' list where each result
-    has 'name', 'chance', and 'multiplier'. Total chance per bet type cannot
-    exceed 1.0 (losing is implicit from remaining probability).
-
-    Args:
-        game: Dictionary containing game configuration
-
-    Raises:
-        ValueError: If validation fails
+    Multi-bet-type games (e.g., Baccarat): each bet type holds its own
+    'possible-results' list (see _results_errors).
     """
     game_name = game["name"]
 
     if "bet-types" not in game:
-        raise ValueError(f"Multi-bet game '{game_name}' must have 'bet-types' field")
+        yield '$', f"Multi-bet game '{game_name}' must have 'bet-types' field"
+        return
 
     bet_types = game["bet-types"]
 
     if not isinstance(bet_types, dict):
-        raise ValueError(f"Game '{game_name}' 'bet-types' must be a dictionary")
+        yield '$.bet-types', f"Game '{game_name}' 'bet-types' must be a dictionary"
+        return
 
     if not bet_types:
-        raise ValueError(f"Game '{game_name}' must have at least one bet type")
+        yield '$.bet-types', f"Game '{game_name}' must have at least one bet type"
+        return
 
     for bet_name, bet_config in bet_types.items():
+        path = f"$.bet-types.{bet_name}"
+
         if not isinstance(bet_name, str) or not bet_name.strip():
-            raise ValueError(f"Game '{game_name}' bet type names must be non-empty strings")
+            yield '$.bet-types', f"Game '{game_name}' bet type names must be non-empty strings"
+            continue
 
         if not isinstance(bet_config, dict):
-            raise ValueError(f"Game '{game_name}' bet type '{bet_name}' must be a dictionary")
+            yield path, f"Game '{game_name}' bet type '{bet_name}' must be a dictionary"
+            continue
 
         if "possible-results" not in bet_config:
-            raise ValueError(f"Game '{game_name}' bet type '{bet_name}' must have 'possible-results' field")
-
-        possible_results = bet_config["possible-results"]
-
-        if not isinstance(possible_results, list):
-            raise ValueError(f"Game '{game_name}' bet type '{bet_name}' 'possible-results' must be a list")
-
-        if not possible_results:
-            raise ValueError(f"Game '{game_name}' bet type '{bet_name}' must have at least one possible result")
-
-        total_chance = 0.0
-        result_names = set()
+            yield path, f"Game '{game_name}' bet type '{bet_name}' must have 'possible-results' field"
+            continue
 
-        for idx, result in enumerate(possible_results):
-            if not isinstance(result, dict):
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result at index {idx} must be a dictionary"
-                )
-
-            # Validate name
-            if "name" not in result:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result at index {idx} must have 'name' field"
-                )
-
-            result_name = result["name"]
-            if not isinstance(result_name, str) or not result_name.strip():
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result at index {idx} name must be a non-empty string"
-                )
-
-            if result_name in result_names:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' has duplicate result name: '{result_name}'"
-                )
-
-            result_names.add(result_name)
-
-            # Validate chance
-            if "chance" not in result:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' must have 'chance' field"
-                )
-
-            chance = result["chance"]
-            if not isinstance(chance, (int, float)):
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' chance must be a number"
-                )
+        yield from _results_errors(
+            bet_config["possible-results"], f"Game '{game_name}' bet type '{bet_name}'", f"{path}.possible-results"
+        )
 
-            if not 0 <= chance <= 1:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' chance must be between 0 and 1"
-                )
 
-            total_chance += chance
+def _single_bet_game_errors(game: dict):
+    """Single-bet-type games (e.g., MTT, Slots): one 'possible-results' list."""
+    game_name = game["name"]
 
-            # Validate multiplier
-            if "multiplier" not in result:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' must have 'multiplier' field"
-                )
+    if "possible-results" not in game:
+        yield '$', f"Single-bet game '{game_name}' must have 'possible-results' field"
+        return
 
-            multiplier = result["multiplier"]
-            if not isinstance(multiplier, (int, float)):
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' multiplier must be a number"
-                )
+    yield from _results_errors(game["possible-results"], f"Game '{game_name}'", '$.possible-results')
 
-            if multiplier < 0:
-                raise ValueError(
-                    f"Game '{game_name}' bet type '{bet_name}' result '{result_name}' multiplier must be non-negative"
-                )
 
-        # Validate total probability per bet type (allow small floating point errors)
-        # Loss is implicit from remaining probability, so total chance can be less than 1
-        if total_chance > 1.01:
-            raise ValueError(
-                f"Game '{game_name}' bet type '{bet_name}' total chance across all results cannot exceed 1.0 "
-                f"(got {total_chance:.4f})"
-            )
+def _results_errors(possible_results, owner: str, path: str):
+    """
+    Errors of a 'possible-results' list, shared by both game types.
 
+    Each result has 'name', 'chance', and 'multiplier'. The total chance
+    cannot exceed 1.0 (losing is implicit from the remaining probability),
+    allowing small floating point errors.
 
-def _validate_single_bet_game(game: dict) -> None:
-    """
-    Validates single-bet-type games (e.g., MTT, Slots).
-    
     Args:
-        game: Dictionary containing game configuration
-        
-    Raises:
-        ValueError: If validation fails
+        possible_results: The list to check
+        owner: Message prefix, "Game 'X'" or "Game 'X' bet type 'Y'"
+        path: JSON path of the list
     """
-    game_name = game["name"]
-    
-    if "possible-results" not in game:
-        raise ValueError(f"Single-bet game '{game_name}' must have 'possible-results' field")
-    
-    possible_results = game["possible-results"]
-    
     if not isinstance(possible_results, list):
-        raise ValueError(f"Game '{game_name}' 'possible-results' must be a list")
-    
+        yield path, f"{owner} 'possible-results' must be a list"
+        return
+
     if not possible_results:
-        raise ValueError(f"Game '{game_name}' must have at least one possible result")
-    
+        yield path, f"{owner} must have at least one possible result"
+        return
+
     total_chance = 0.0
     result_names = set()
-    
+
     for idx, result in enumerate(possible_results):
+        result_path = f"{path}[{idx}]"
+
         if not isinstance(result, dict):
-            raise ValueError(f"Game '{game_name}' result at index {idx} must be a dictionary")
-        
+            yield result_path, f"{owner} result at index {idx} must be a dictionary"
+            continue
+
         # Validate name
         if "name" not in result:
-            raise ValueError(f"Game '{game_name}' result at index {idx} must have 'name' field")
-        
+            yield result_path, f"{owner} result at index {idx} must have 'name' field"
+            continue
+
         result_name = result["name"]
         if not isinstance(result_name, str) or not result_name.strip():
-            raise ValueError(f"Game '{game_name}' result at index {idx} name must be a non-empty string")
-        
+            yield f"{result_path}.name", f"{owner} result at index {idx} name must be a non-empty string"
+            continue
+
         if result_name in result_names:
-            raise ValueError(f"Game '{game_name}' has duplicate result name: '{result_name}'")
-        
+            yield f"{result_path}.name", f"{owner} has duplicate result name: '{result_name}'"
+            continue
+
         result_names.add(result_name)
-        
+
         # Validate chance
         if "chance" not in result:
-            raise ValueError(f"Game '{game_name}' result '{result_name}' must have 'chance' field")
-        
-        chance = result["chance"]
-        if not isinstance(chance, (int, float)):
-            raise ValueError(f"Game '{game_name}' result '{result_name}' chance must be a number")
-        
-        if not 0 <= chance <= 1:
-            raise ValueError(f"Game '{game_name}' result '{result_name}' chance must be between 0 and 1")
-        
-        total_chance += chance
-        
+            yield result_path, f"{owner} result '{result_name}' must have 'chance' field"
+        elif not isinstance(result["chance"], (int, float)):
+            yield f"{result_path}.chance", f"{owner} result '{result_name}' chance must be a number"
+        elif not 0 <= result["chance"] <= 1:
+            yield f"{result_path}.chance", f"{owner} result '{result_name}' chance must be between 0 and 1"
+        else:
+            total_chance += result["chance"]
+
         # Validate multiplier
         if "multiplier" not in result:
-            raise ValueError(f"Game '{game_name}' result '{result_name}' must have 'multiplier' field")
-        
-        multiplier = result["multiplier"]
-        if not isinstance(multiplier, (int, float)):
-            raise ValueError(f"Game '{game_name}' result '{result_name}' multiplier must be a number")
-        
-        if multiplier < 0:
-            raise ValueError(f"Game '{game_name}' result '{result_name}' multiplier must be non-negative")
-    
-    # Validate total probability (allow small floating point errors)
-    # Note: For single-bet games, total chance can be less than 1 (losing is implicit)
+            yield result_path, f"{owner} result '{result_name}' must have 'multiplier' field"
+        elif not isinstance(result["multiplier"], (int, float)):
+            yield f"{result_path}.multiplier", f"{owner} result '{result_name}' multiplier must be a number"
+        elif result["multiplier"] < 0:
+            yield f"{result_path}.multiplier", f"{owner} result '{result_name}' multiplier must be non-negative"
+
     if total_chance > 1.01:
-        raise ValueError(
-            f"Game '{game_name}' total chance across all results cannot exceed 1.0 "
+        yield path, (
+            f"{owner} total chance across all results cannot exceed 1.0 "
             f"(got {total_chance:.4f})"
         )
 
@@ -233,7 +185,7 @@ def _validate_single_bet_game(game: dict) -> None:
 def validate_session_schema(session: dict) -> bool:
     """
     Validates session schema.
-    
+
     Rules:
     - 'name' is required
     - At least one of: stop-loss-size, stop-loss-percent, stop-gain-percent is required
@@ -241,115 +193,304 @@ def validate_session_schema(session: dict) -> bool:
     - 'bets' is required and must be a non-empty list
     - Each bet must have either 'bet-size' or 'bet-percent' (one is required)
     - bet-percent must be >0 and <1
-    
+    - min-quantity and max-quantity are integers >= 0, min-quantity <= max-quantity
+
     Args:
         session: Dictionary containing session configuration
-        
+
     Returns:
         bool: True if schema is valid
-        
+
     Raises:
         ValueError: If schema validation fails with detailed error message
     """
-    # Check that session is a dictionary
-    if not isinstance(session, dict):
-        raise ValueError("Session must be a dictionary")
-    
-    # Validate name field
-    if "name" not in session:
-        raise ValueError("Session must have a 'name' field")
-    
-    if not isinstance(session["name"], str) or not session["name"].strip():
-        raise ValueError("Session 'name' must be a non-empty string")
-    
+    for path, message in _session_errors(session):
+        raise ValueError(message)
+    return True
+
+
+def _session_errors(session):
+    """Yields (JSON path, message) for every problem of a session."""
+    errors = list(_name_errors(session, "Session"))
+    if errors:
+        yield from errors
+        return
+
     session_name = session["name"]
-    
+
     # Validate stop-loss-size if present (optional)
     if "stop-loss-size" in session:
         stop_loss_size = session["stop-loss-size"]
         if not isinstance(stop_loss_size, (int, float)):
-            raise ValueError(
-                f"Session '{session_name}' 'stop-loss-size' must be a number"
-            )
-        if stop_loss_size <= 0:
-            raise ValueError(
-                f"Session '{session_name}' 'stop-loss-size' must be greater than 0"
-            )
-    
-    # Validate stop-loss-percent if present (optional)
-    if "stop-loss-percent" in session:
-        stop_loss_percent = session["stop-loss-percent"]
-        if not isinstance(stop_loss_percent, (int, float)):
-            raise ValueError(
-                f"Session '{session_name}' 'stop-loss-percent' must be a number"
-            )
-        if not (0 < stop_loss_percent < 1):
-            raise ValueError(
-                f"Session '{session_name}' 'stop-loss-percent' must be greater than 0 and less than 1"
-            )
-    
-    # Validate stop-gain-percent if present (optional)
-    if "stop-gain-percent" in session:
-        stop_gain_percent = session["stop-gain-percent"]
-        if not isinstance(stop_gain_percent, (int, float)):
-            raise ValueError(
-                f"Session '{session_name}' 'stop-gain-percent' must be a number"
-            )
-        if not (0 < stop_gain_percent < 1):
-            raise ValueError(
-                f"Session '{session_name}' 'stop-gain-percent' must be greater than 0 and less than 1"
-            )
-    
+            yield '$.stop-loss-size', f"Session '{session_name}' 'stop-loss-size' must be a number"
+        elif stop_loss_size <= 0:
+            yield '$.stop-loss-size', f"Session '{session_name}' 'stop-loss-size' must be greater than 0"
+
+    # Validate stop-loss-percent and stop-gain-percent if present (optional)
+    for key in ("stop-loss-percent", "stop-gain-percent"):
+        if key not in session:
+            continue
+        percent = session[key]
+        if not isinstance(percent, (int, float)):
+            yield f'$.{key}', f"Session '{session_name}' '{key}' must be a number"
+        elif not (0 < percent < 1):
+            yield f'$.{key}', f"Session '{session_name}' '{key}' must be greater than 0 and less than 1"
+
     # Validate bets field
     if "bets" not in session:
-        raise ValueError(f"Session '{session_name}' must have a 'bets' field")
-    
+        yield '$', f"Session '{session_name}' must have a 'bets' field"
+        return
+
     bets = session["bets"]
-    
+
     if not isinstance(bets, list):
-        raise ValueError(f"Session '{session_name}' 'bets' must be a list")
-    
+        yield '$.bets', f"Session '{session_name}' 'bets' must be a list"
+        return
+
     if not bets:
-        raise ValueError(f"Session '{session_name}' must have at least one bet")
-    
+        yield '$.bets', f"Session '{session_name}' must have at least one bet"
+        return
+
     # Validate each bet
     for idx, bet in enumerate(bets):
+        path = f"$.bets[{idx}]"
+        owner = f"Session '{session_name}' bet at index {idx}"
+
         if not isinstance(bet, dict):
-            raise ValueError(
-                f"Session '{session_name}' bet at index {idx} must be a dictionary"
-            )
-        
+            yield path, f"{owner} must be a dictionary"
+            continue
+
         # Check that bet has either bet-size or bet-percent
         has_bet_size = "bet-size" in bet
         has_bet_percent = "bet-percent" in bet
-        
+
         if not (has_bet_size or has_bet_percent):
-            raise ValueError(
-                f"Session '{session_name}' bet at index {idx} must have either 'bet-size' or 'bet-percent'"
-            )
-        
+            yield path, f"{owner} must have either 'bet-size' or 'bet-percent'"
+            continue
+
         # Validate bet-size if present
         if has_bet_size:
             bet_size = bet["bet-size"]
             if not isinstance(bet_size, (int, float)):
-                raise ValueError(
-                    f"Session '{session_name}' bet at index {idx} 'bet-size' must be a number"
-                )
-            if bet_size <= 0:
-                raise ValueError(
-                    f"Session '{session_name}' bet at index {idx} 'bet-size' must be greater than 0"
-                )
-        
+                yield f"{path}.bet-size", f"{owner} 'bet-size' must be a number"
+            elif bet_size <= 0:
+                yield f"{path}.bet-size", f"{owner} 'bet-size' must be greater than 0"
+
         # Validate bet-percent if present
         if has_bet_percent:
             bet_percent = bet["bet-percent"]
             if not isinstance(bet_percent, (int, float)):
-                raise ValueError(
-                    f"Session '{session_name}' bet at index {idx} 'bet-percent' must be a number"
+                yield f"{path}.bet-percent", f"{owner} 'bet-percent' must be a number"
+            elif not (0 < bet_percent < 1):
+                yield f"{path}.bet-percent", f"{owner} 'bet-percent' must be greater than 0 and less than 1"
+
+        # Validate min-quantity and max-quantity if present (max defaults to min, min to 1)
+        quantities_valid = True
+        for key in ("min-quantity", "max-quantity"):
+            if key not in bet:
+                continue
+            quantity = bet[key]
+            if not isinstance(quantity, int):
+                yield f"{path}.{key}", f"{owner} '{key}' must be an integer"
+                quantities_valid = False
+            elif quantity < 0:
+                yield f"{path}.{key}", f"{owner} '{key}' must not be negative"
+                quantities_valid = False
+        if quantities_valid:
+            min_quantity = bet.get("min-quantity", 1)
+            if min_quantity > bet.get("max-quantity", min_quantity):
+                yield f"{path}.min-quantity", f"{owner} 'min-quantity' must not be greater than 'max-quantity'"
+
+
+def validate_simulation_schema(simulation: dict) -> bool:
+    """
+    Validates simulation schema.
+
+    Rules:
+    - 'name' is required
+    - 'start-bankroll' is required and must be a number greater than 0
+    - 'actions' is required and must be a list
+    - Each action has a 'type' among 'play', 'withdraw' and 'aport'
+    - 'play' actions need the session 'name', 'withdraw'/'aport' a 'size' greater than 0
+
+    Args:
+        simulation: Dictionary containing simulation configuration
+
+    Returns:
+        bool: True if schema is valid
+
+    Raises:
+        ValueError: If schema validation fails with detailed error message
+    """
+    for path, message in _simulation_errors(simulation):
+        raise ValueError(message)
+    return True
+
+
+def _simulation_errors(simulation):
+    """Yields (JSON path, message) for every problem of a simulation."""
+    errors = list(_name_errors(simulation, "Simulation"))
+    if errors:
+        yield from errors
+        return
+
+    simulation_name = simulation["name"]
+
+    if "start-bankroll" not in simulation:
+        yield '$', f"Simulation '{simulation_name}' must have a 'start-bankroll' field"
+    elif not isinstance(simulation["start-bankroll"], (int, float)):
+        yield '$.start-bankroll', f"Simulation '{simulation_name}' 'start-bankroll' must be a number"
+    elif simulation["start-bankroll"] <= 0:
+        yield '$.start-bankroll', f"Simulation '{simulation_name}' 'start-bankroll' must be greater than 0"
+
+    if "actions" not in simulation:
+        yield '$', f"Simulation '{simulation_name}' must have an 'actions' field"
+        return
+
+    actions = simulation["actions"]
+    if not isinstance(actions, list):
+        yield '$.actions', f"Simulation '{simulation_name}' 'actions' must be a list"
+        return
+
+    for idx, action in enumerate(actions):
+        path = f"$.actions[{idx}]"
+        owner = f"Simulation '{simulation_name}' action at index {idx}"
+
+        if not isinstance(action, dict):
+            yield path, f"{owner} must be a dictionary"
+            continue
+
+        action_type = action.get("type")
+        if action_type not in ACTION_TYPES:
+            yield f"{path}.type", f"{owner} 'type' must be one of {ACTION_TYPES}"
+            continue
+
+        if action_type == "play":
+            if not isinstance(action.get("name"), str) or not action["name"].strip():
+                yield f"{path}.name", f"{owner} must have a non-empty 'name'"
+        elif "size" not in action:
+            yield path, f"{owner} must have a 'size' field"
+        elif not isinstance(action["size"], (int, float)):
+            yield f"{path}.size", f"{owner} 'size' must be a number"
+        elif action["size"] <= 0:
+            yield f"{path}.size", f"{owner} 'size' must be greater than 0"
+
+
+# (validator, sha256 of the file) of every configuration known to be valid,
+# filled by the registries and validate_config_tree
+_valid_digests = set()
+
+def file_digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+def is_known_valid(validator, digest: str) -> bool:
+    return (validator, digest) in _valid_digests
+
+def mark_valid(validator, digest: str) -> None:
+    _valid_digests.add((validator, digest))
+
+
+_ERRORS = {
+    validate_game_schema: _game_errors,
+    validate_session_schema: _session_errors,
+    validate_simulation_schema: _simulation_errors,
+}
+
+def _load_dir(dir: str, validator, report) -> dict:
+    """Parses and checks every json file of a directory, returning name -> (filepath, item)."""
+    items = {}
+    for filename in sorted(os.listdir(dir)):
+        if not filename.endswith('.json'):
+            continue
+        filepath = os.path.join(dir, filename)
+
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        try:
+            item = json.loads(raw)
+        except ValueError as e:
+            report(filepath, '$', f"Invalid JSON: {e}")
+            continue
+
+        digest = file_digest(raw)
+        if not is_known_valid(validator, digest):
+            errors = list(_ERRORS[validator](item))
+            for path, message in errors:
+                report(filepath, path, message)
+            if errors:
+                continue
+            mark_valid(validator, digest)
+
+        name = item['name']
+        if name in items:
+            report(filepath, '$.name', f"Duplicate name '{name}', already used by '{items[name][0]}'")
+            continue
+        items[name] = (filepath, item)
+    return items
+
+
+def validate_config_tree(games_dir: str = None, sessions_dir: str = None, simulations_dir: str = None) -> list:
+    """
+    Checks every configuration of a tree in one pass, collecting all errors.
+
+    Besides each file's schema, cross-references are checked: a session's
+    'game' (and 'bet-type' for multi-bet games) must exist in games_dir,
+    and every 'play' action of a simulation must name a session of
+    sessions_dir. References are only checked when the referenced
+    directory is given. Files found valid are remembered by content hash,
+    so later registry lookups of them are not validated again.
+
+    Args:
+        games_dir: Directory containing game configurations
+        sessions_dir: Directory containing session configurations
+        simulations_dir: Directory containing simulation configurations
+
+    Returns:
+        List of errors, each a dict with 'file', 'path' (JSON path inside
+        the file) and 'message'; empty when the tree is valid
+    """
+    errors = []
+
+    def report(filepath, path, message):
+        errors.append({'file': filepath, 'path': path, 'message': message})
+
+    games = _load_dir(games_dir, validate_game_schema, report) if games_dir else None
+    sessions = _load_dir(sessions_dir, validate_session_schema, report) if sessions_dir else None
+    simulations = _load_dir(simulations_dir, validate_simulation_schema, report) if simulations_dir else {}
+
+    for filepath, session in (sessions or {}).values():
+        if games is None:
+            break
+        for idx, bet in enumerate(session['bets']):
+            path = f"$.bets[{idx}]"
+            owner = f"Session '{session['name']}' bet at index {idx}"
+
+            if 'game' not in bet:
+                report(filepath, path, f"{owner} must have a 'game' field")
+                continue
+            if bet['game'] not in games:
+                report(filepath, f"{path}.game", f"{owner} references unknown game '{bet['game']}'")
+                continue
+
+            game = games[bet['game']][1]
+            if not game['multi-bet-type']:
+                continue
+            if bet.get('bet-type') is None:
+                report(filepath, path, f"{owner} must have a 'bet-type' for game '{bet['game']}'")
+            elif bet['bet-type'] not in game['bet-types']:
+                report(
+                    filepath, f"{path}.bet-type",
+                    f"{owner} references unknown bet type '{bet['bet-type']}' of game '{bet['game']}'",
                 )
-            if not (0 < bet_percent < 1):
-                raise ValueError(
-                    f"Session '{session_name}' bet at index {idx} 'bet-percent' must be greater than 0 and less than 1"
+
+    for filepath, simulation in simulations.values():
+        if sessions is None:
+            break
+        for idx, action in enumerate(simulation['actions']):
+            if action['type'] == 'play' and action['name'] not in sessions:
+                report(
+                    filepath, f"$.actions[{idx}].name",
+                    f"Simulation '{simulation['name']}' action at index {idx} references unknown session '{action['name']}'",
                 )
-    
-    return True
\ No newline at end of file
+
+    return errors
@@ -0,0 +1,560 @@
+import os
+import json
+import math
+import asyncio
+import secrets
+import hashlib
+import argparse
+import http.client
+import socket
+from functools import partial
+from collections import deque
+from statistics import NormalDist
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from .finder import get_registry, find_session_by_name, find_simulation_by_name, find_game_by_name
+from .schema_validator import validate_simulation_schema
+from .plan import get_simulation_plan
+from .play import ENGINE_VERSION
+from .cache import resolve_configs
+from .batch import aggregate_chunk, half_widths, CONVERGENCE_TARGETS
+from .stats import BankrollAggregator
+from .sweep import sweep_tasks, run_cell
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# the server only ever listens on the loopback interface
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# required fields of the job spec of each kind
+JOB_FIELDS = {
+    'simulation': ('simulation', 'runs'),
+    'sweep-session': ('session', 'bankroll', 'grid', 'runs'),
+    'sweep-simulation': ('simulation', 'session', 'grid', 'runs'),
+}
+JOB_KINDS = tuple(JOB_FIELDS)
+JOB_STATES = ('running', 'done', 'failed', 'cancelled')
+
+# finished jobs kept for GET /jobs/<id>, oldest dropped first
+FINISHED_JOBS = 100
+
+
+def _warm_worker(dirs: tuple) -> None:
+    """Pool initializer: loads and compiles every simulation once per worker."""
+    simulations_dir, sessions_dir, games_dir = dirs
+    for name in get_registry(simulations_dir, validate_simulation_schema).names():
+        try:
+            get_simulation_plan(simulations_dir, sessions_dir, games_dir, name)
+        except ValueError:
+            # an invalid configuration fails the jobs using it, not the worker
+            pass
+
+
+def _ping(_=None) -> int:
+    return os.getpid()
+
+
+def _session_configs(session_config: dict, games_dir: str) -> dict:
+    """A session and the games it bets on, the content a sweep-session job depends on."""
+    games = {}
+    for bet_config in session_config['bets']:
+        if bet_config['game'] not in games:
+            games[bet_config['game']] = find_game_by_name(games_dir, bet_config['game'])
+    return {'sessions': {session_config['name']: session_config}, 'games': games}
+
+
+def _partial(aggregator: BankrollAggregator, quantiles: tuple) -> dict:
+    """Small summary of the runs merged so far, sent with every progress event."""
+    return {
+        'runs': aggregator.runs,
+        'mean': aggregator.final.mean,
+        'std': math.sqrt(aggregator.final.variance),
+        'bankrupt-rate': aggregator.bankrupt / aggregator.runs if aggregator.runs else math.nan,
+        'quantiles': {q: aggregator.quantile(q) for q in quantiles},
+    }
+
+
+class Job:
+    """
+    One job of the service and the events it has published so far.
+
+    Every subscriber replays the events from the start (see follow), so a
+    client attaching to a running job, e.g. a deduplicated submission,
+    sees the same stream as the one that started it.
+    """
+
+    def __init__(self, job_id: str, key: str, spec: dict):
+        self.id = job_id
+        self.key = key
+        self.spec = spec
+        self.state = 'running'
+        self.events = []
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def publish(self, event: str, **data) -> None:
+        self.events.append({'event': event, 'job': self.id, **data})
+        # wake every follower; later waits use a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish(self, state: str, event: str, **data) -> None:
+        self.state = state
+        self.publish(event, **data)
+
+    async def follow(self):
+        """Yields every event of the job, waiting for new ones until it finishes."""
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.state != 'running':
+                return
+            await self._changed.wait()
+
+    def status(self) -> dict:
+        progress = next((event for event in reversed(self.events) if event['event'] == 'progress'), None)
+        return {
+            'job': self.id,
+            'kind': self.spec['kind'],
+            'state': self.state,
+            'done': progress['done'] if progress else 0,
+            'total': progress['total'] if progress else None,
+        }
+
+
+class SimulationService:
+    """
+    Simulation jobs played on a warm process pool.
+
+    The workers load and compile every configuration once, when the pool
+    starts, and keep their registries (files are reloaded when they change
+    on disk). A job is keyed by its parameters, its seed, ENGINE_VERSION and
+    the content of every configuration it reads, so identical submissions
+    made while the first one runs attach to it instead of playing it again.
+    Jobs without a seed are keyed as such and get a random seed when they
+    start, so identical seedless submissions are deduplicated too.
+
+    Job specs (dicts):
+    - 'simulation': 'simulation', 'runs', optional 'seed', 'chunk-size',
+      'quantiles', 'options' (BankrollAggregator keyword arguments) and
+      'targets' (statistic -> half-width, as in run_until_converged, in
+      which case 'runs' is the maximum)
+    - 'sweep-session': 'session', 'bankroll', 'grid', 'runs', optional 'seed'
+    - 'sweep-simulation': 'simulation', 'session', 'grid', 'runs', optional 'seed'
+
+    Simulation chunks are merged in run order, so results match
+    aggregate_batch / run_until_converged with the same seed and chunk size.
+    """
+
+    def __init__(self, simulations_dir: str, sessions_dir: str, games_dir: str, workers: int = None):
+        self.dirs = (simulations_dir, sessions_dir, games_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.jobs = {}
+        self._running = {}
+        self._finished = deque()
+
+    async def start(self) -> None:
+        """Starts the pool and waits until every worker is up and warm."""
+        _warm_worker(self.dirs)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_warm_worker, initargs=(self.dirs,))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)))
+
+    async def close(self) -> None:
+        for job in list(self._running.values()):
+            await self.cancel(job.id)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def _job_key(self, spec: dict) -> str:
+        simulations_dir, sessions_dir, games_dir = self.dirs
+        if spec['kind'] == 'sweep-session':
+            configs = _session_configs(find_session_by_name(sessions_dir, spec['session']), games_dir)
+        else:
+            configs = resolve_configs(simulations_dir, sessions_dir, games_dir, spec['simulation'])
+            if spec['kind'] == 'sweep-simulation':
+                configs['sessions'][spec['session']] = find_session_by_name(sessions_dir, spec['session'])
+
+        content = json.dumps(
+            {'engine': ENGINE_VERSION, 'spec': spec, 'configs': configs},
+            sort_keys=True, separators=(',', ':'),
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def submit(self, spec: dict) -> tuple:
+        """
+        Starts a job, or joins the identical one already running.
+
+        Raises:
+            ValueError: If the spec is malformed or names an unknown configuration
+
+        Returns:
+            (Job, deduplicated)
+        """
+        if not isinstance(spec, dict) or spec.get('kind') not in JOB_KINDS:
+            raise ValueError(f"Job 'kind' must be one of {JOB_KINDS}")
+        missing = [field for field in JOB_FIELDS[spec['kind']] if field not in spec]
+        if missing:
+            raise ValueError(f"Job of kind '{spec['kind']}' is missing {missing}")
+        if not isinstance(spec.get('runs'), int) or spec['runs'] < 1:
+            raise ValueError("Job 'runs' must be a positive integer")
+        if 'grid' in JOB_FIELDS[spec['kind']] and not isinstance(spec['grid'], dict):
+            raise ValueError("Job 'grid' must map parameters to lists of values")
+        unknown = set(spec.get('targets', {})) - set(CONVERGENCE_TARGETS)
+        if unknown:
+            raise ValueError(f"Unknown convergence targets {sorted(unknown)}, expected any of {CONVERGENCE_TARGETS}")
+
+        # keyed before a missing seed is drawn, so identical seedless jobs
+        # share the run (and the seed) of the first one
+        spec = dict(spec, seed=spec.get('seed'))
+        key = self._job_key(spec)
+        running = self._running.get(key)
+        if running is not None:
+            return running, True
+
+        if spec['seed'] is None:
+            spec['seed'] = secrets.randbits(63)
+
+        if spec['kind'] == 'simulation':
+            runner = self._run_simulation
+        else:
+            # built here, so an unknown session or a bad grid is refused
+            # before the job exists
+            simulations_dir, sessions_dir, games_dir = self.dirs
+            tasks = sweep_tasks(
+                simulations_dir, sessions_dir, games_dir, spec['session'], spec['grid'], spec['runs'],
+                spec['seed'], spec.get('simulation'), spec.get('bankroll'),
+            )
+            runner = partial(self._run_sweep, tasks=tasks)
+
+        job = Job(secrets.token_hex(8), key, spec)
+        self.jobs[job.id] = job
+        self._running[key] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job, runner))
+        return job, False
+
+    async def cancel(self, job_id: str) -> Job:
+        """Cancels a job and waits until it has stopped, so its state is final."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.state == 'running':
+            job.task.cancel()
+            await asyncio.wait([job.task])
+        return job
+
+    async def _run(self, job: Job, runner) -> None:
+        try:
+            result = await runner(job)
+        except asyncio.CancelledError:
+            job.finish('cancelled', 'cancelled')
+        except Exception as e:
+            job.finish('failed', 'failed', error=f"{type(e).__name__}: {e}")
+        else:
+            job.finish('done', 'done', result=result)
+        finally:
+            del self._running[job.key]
+            self._finished.append(job.id)
+            while len(self._finished) > FINISHED_JOBS:
+                self.jobs.pop(self._finished.popleft(), None)
+
+    async def _run_simulation(self, job: Job) -> dict:
+        spec = job.spec
+        simulations_dir, sessions_dir, games_dir = self.dirs
+        runs = spec['runs']
+        chunk_size = spec.get('chunk-size', 1000)
+        quantiles = tuple(spec.get('quantiles', (0.05, 0.25, 0.5, 0.75, 0.95)))
+        options = spec.get('options', {})
+        targets = spec.get('targets', {})
+        z = NormalDist().inv_cdf((1 + spec.get('confidence', 0.95)) / 2)
+
+        sim_config = find_simulation_by_name(simulations_dir, spec['simulation'])
+        aggregator = BankrollAggregator(sim_config['start-bankroll'], **options)
+
+        def converged() -> bool:
+            if not targets or aggregator.runs < spec.get('min-runs', 1000):
+                return False
+            widths = half_widths(aggregator, z)
+            return all(widths[statistic] <= target for statistic, target in targets.items())
+
+        tasks = (
+            (simulations_dir, sessions_dir, games_dir, spec['simulation'], spec['seed'],
+             start, min(start + chunk_size, runs), None, options)
+            for start in range(0, runs, chunk_size)
+        )
+
+        # a couple of chunks per worker in flight, merged in run order
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(loop.run_in_executor(self.pool, aggregate_chunk, task))
+                if len(pending) < 2 * self.workers:
+                    continue
+                aggregator.merge(await pending.popleft())
+                job.publish('progress', done=aggregator.runs, total=runs, partial=_partial(aggregator, quantiles))
+                if converged():
+                    break
+            else:
+                while pending and not converged():
+                    aggregator.merge(await pending.popleft())
+                    job.publish('progress', done=aggregator.runs, total=runs, partial=_partial(aggregator, quantiles))
+        finally:
+            for future in pending:
+                future.cancel()
+
+        result = aggregator.to_dict(quantiles, spec.get('points'))
+        if targets:
+            widths = half_widths(aggregator, z)
+            result['converged'] = converged()
+            result['half-widths'] = {statistic: widths[statistic] for statistic in targets}
+        return result
+
+    async def _run_sweep(self, job: Job, tasks: list) -> list:
+        # every cell is queued at once; rows are streamed as they complete
+        # and returned in grid order
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self.pool, run_cell, task) for task in tasks]
+        index = {future: i for i, future in enumerate(futures)}
+        rows = [None] * len(futures)
+        pending = set(futures)
+        done = 0
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in sorted(finished, key=index.get):
+                    rows[index[future]] = future.result()
+                    done += 1
+                    job.publish('progress', done=done, total=len(rows), row=rows[index[future]])
+        finally:
+            for future in pending:
+                future.cancel()
+        return rows
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves one HTTP/1.1 request, then closes the connection."""
+        try:
+            await self._route(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await _send_json(writer, 500, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _route(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            return await _send_json(writer, 400, {'error': "Malformed request line"})
+        method, target, _ = request_line
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+
+        if method == 'GET' and parts == ['health']:
+            return await _send_json(writer, 200, {
+                'status': 'ok', 'workers': self.workers, 'running': len(self._running),
+            })
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                return await _send_json(writer, 200, [job.status() for job in self.jobs.values()])
+            if method == 'POST':
+                try:
+                    job, deduplicated = self.submit(json.loads(body or b'null'))
+                except ValueError as e:
+                    return await _send_json(writer, 400, {'error': str(e)})
+                accepted = {'event': 'accepted', 'job': job.id, 'deduplicated': deduplicated}
+                if query.get('stream', ['1'])[0] == '0':
+                    return await _send_json(writer, 200, accepted)
+                return await _stream(writer, job, accepted)
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return await _send_json(writer, 404, {'error': f"Job '{parts[1]}' not found"})
+            if method == 'GET':
+                if query.get('stream', ['1'])[0] == '0':
+                    return await _send_json(writer, 200, job.status())
+                return await _stream(writer, job)
+            if method == 'DELETE':
+                await self.cancel(job.id)
+                return await _send_json(writer, 200, job.status())
+
+        return await _send_json(writer, 404, {'error': f"No route for {method} {url.path}"})
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+def _head(writer: asyncio.StreamWriter, status: int, content_type: str, length: int = None) -> None:
+    lines = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, data) -> None:
+    body = json.dumps(data).encode('utf-8')
+    _head(writer, status, 'application/json', len(body))
+    writer.write(body)
+    await writer.drain()
+
+async def _stream(writer: asyncio.StreamWriter, job: Job, first: dict = None) -> None:
+    """
+    Streams the events of a job as NDJSON, one JSON object per line, until
+    it finishes. A client going away only stops its stream, never the job.
+    """
+    _head(writer, 200, 'application/x-ndjson')
+    if first is not None:
+        writer.write(json.dumps(first).encode('utf-8') + b'\n')
+    async for event in job.follow():
+        writer.write(json.dumps(event).encode('utf-8') + b'\n')
+        await writer.drain()
+
+
+def _check_local(host: str) -> None:
+    if host not in LOCAL_HOSTS:
+        raise ValueError(f"The service only listens on localhost, expected one of {LOCAL_HOSTS}, got '{host}'")
+
+
+async def serve(simulations_dir: str, sessions_dir: str, games_dir: str, host: str = DEFAULT_HOST,
+                port: int = DEFAULT_PORT, unix_socket: str = None, workers: int = None) -> None:
+    """
+    Runs the service until cancelled.
+
+    Endpoints (JSON bodies, NDJSON streams of events):
+    - POST /jobs: submits a job spec (see SimulationService) and streams its
+      'accepted', 'progress' and final 'done' / 'failed' / 'cancelled'
+      events; with ?stream=0 only the 'accepted' event is returned
+    - GET /jobs: status of every known job
+    - GET /jobs/<id>: streams the job's events from the start (?stream=0 for its status)
+    - DELETE /jobs/<id>: cancels the job
+    - GET /health
+
+    Args:
+        host: Loopback address to listen on (see LOCAL_HOSTS)
+        port: TCP port
+        unix_socket: Path of a Unix socket to listen on instead of TCP
+        workers: Number of worker processes (None uses every core)
+    """
+    if unix_socket is None:
+        _check_local(host)
+
+    service = SimulationService(simulations_dir, sessions_dir, games_dir, workers)
+    await service.start()
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(service.handle, unix_socket)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def _connect(address, timeout: float = None) -> http.client.HTTPConnection:
+    if isinstance(address, str):
+        return _UnixHTTPConnection(address, timeout)
+    host, port = address
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def submit_job(spec: dict, address=(DEFAULT_HOST, DEFAULT_PORT), timeout: float = None):
+    """
+    Submits a job to a running service and yields its events as they arrive.
+
+    Example:
+        for event in submit_job({'kind': 'simulation', 'simulation': 'Month Baccarat', 'runs': 100000, 'seed': 1}):
+            if event['event'] == 'progress':
+                print(event['done'], event['partial']['mean'])
+        result = event['result']
+
+    Args:
+        spec: Job spec (see SimulationService)
+        address: (host, port) of the service, or the path of its Unix socket
+        timeout: Socket timeout in seconds
+
+    Raises:
+        ValueError: If the service rejects the job
+    """
+    connection = _connect(address, timeout)
+    try:
+        connection.request('POST', '/jobs', body=json.dumps(spec), headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            raise ValueError(json.loads(response.read())['error'])
+        for line in response:
+            yield json.loads(line)
+    finally:
+        connection.close()
+
+
+def cancel_job(job_id: str, address=(DEFAULT_HOST, DEFAULT_PORT), timeout: float = None) -> dict:
+    """Cancels a job of a running service and returns its status."""
+    connection = _connect(address, timeout)
+    try:
+        connection.request('DELETE', f'/jobs/{job_id}')
+        response = connection.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(data['error'])
+        return data
+    finally:
+        connection.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serves simulation and sweep jobs on localhost from a warm process pool.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="loopback address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument('--unix-socket', default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--simulations-dir', default='config/simulations')
+    parser.add_argument('--sessions-dir', default='config/sessions')
+    parser.add_argument('--games-dir', default='config/games')
+    args = parser.parse_args(argv)
+
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Serving simulation jobs at {where}")
+    try:
+        asyncio.run(serve(
+            args.simulations_dir, args.sessions_dir, args.games_dir,
+            host=args.host, port=args.port, unix_socket=args.unix_socket, workers=args.workers,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import numpy as np
+from .finder import find_session_by_name, find_simulation_by_name
+from .plan import get_session_plan
+
+# Bankrolls are merged on this many decimals, so paths reaching the same
+# amount through a different order of wins and losses share a lattice point.
+PRECISION = 9
+
+
+def _add(distribution: dict, key, probability: float) -> None:
+    distribution[key] = distribution.get(key, 0.0) + probability
+
+
+def _propagate_session(plan, bankroll: float, skip: bool = True) -> tuple:
+    """
+    Exact distribution of one session plan started at 'bankroll'.
+
+    With skip False, bets are never skipped for lack of bankroll (see
+    _translation_floor).
+
+    Returns:
+        (outcomes, expected_bets) where outcomes maps (final bankroll,
+        stop reason) to its probability
+    """
+    loss_threshold, win_threshold = plan.thresholds(bankroll)
+
+    active = {bankroll: 1.0}
+    outcomes = {}
+    expected_bets = 0.0
+
+    for bet_plan in plan.bets:
+        if not active:
+            break
+
+        sampler = bet_plan.sampler
+        steps = [(multiplier, chance) for multiplier, chance in zip(sampler.multipliers, sampler.chances) if chance > 0]
+
+        min_quantity = bet_plan.min_quantity
+        max_quantity = bet_plan.max_quantity
+
+        # the bet size is fixed when the group starts, so it is part of the state
+        if bet_plan.percent is None:
+            current = {(b, bet_plan.size): p for b, p in active.items()}
+        else:
+            current = {(b, b * bet_plan.percent): p for b, p in active.items()}
+
+        finished = {}
+        for attempt in range(max_quantity + 1):
+            if attempt >= min_quantity:
+                # paths whose drawn quantity is 'attempt' leave the group here
+                remaining = max_quantity - attempt + 1
+                leaving = 1.0 / remaining if attempt < max_quantity else 1.0
+                for (b, size), p in current.items():
+                    _add(finished, b, p * leaving)
+                if attempt == max_quantity:
+                    break
+                current = {state: p * (1 - leaving) for state, p in current.items()}
+
+            following = {}
+            for (b, size), p in current.items():
+                if b <= loss_threshold:
+                    _add(outcomes, (b, 'stop-loss'), p)
+                elif b >= win_threshold:
+                    _add(outcomes, (b, 'stop-win'), p)
+                elif skip and size > b:
+                    _add(following, (b, size), p)
+                else:
+                    expected_bets += p
+                    for multiplier, chance in steps:
+                        after = round((b - size) + size * multiplier, PRECISION)
+                        _add(following, (after, size), p * chance)
+            current = following
+
+        active = finished
+
+    for b, p in active.items():
+        _add(outcomes, (b, 'completed'), p)
+
+    return outcomes, expected_bets
+
+
+def _translation_floor(plan):
+    """
+    Lowest starting bankroll from which the session is translation invariant.
+
+    With fixed bet sizes and a fixed stop-loss, a session started at b never
+    skips a bet once b - stop-loss-size covers the largest bet: the stop
+    fires first. Its outcomes are then the ones from 0 shifted by b. Returns
+    None when the session has no such floor.
+    """
+    if plan.loss_size is None:
+        return None
+    if plan.loss_percent is not None or plan.gain_percent is not None:
+        return None
+    if any(bet_plan.percent is not None for bet_plan in plan.bets):
+        return None
+    return plan.loss_size + max(bet_plan.size for bet_plan in plan.bets)
+
+
+def _merge(values: np.ndarray, probabilities: np.ndarray) -> tuple:
+    """Sums the probabilities of equal (rounded) bankroll values."""
+    values, inverse = np.unique(np.round(values, PRECISION), return_inverse=True)
+    return values, np.bincount(inverse.ravel(), weights=probabilities, minlength=len(values))
+
+
+def _summarize(distribution: dict, expected_bets: float) -> dict:
+    distribution = dict(sorted(distribution.items()))
+    return {
+        'distribution': distribution,
+        'expected-bankroll': sum(b * p for b, p in distribution.items()),
+        'ruin-probability': sum(p for b, p in distribution.items() if b <= 0),
+        'expected-bets': float(expected_bets),
+    }
+
+
+def solve_session(sessions_dir: str, games_dir: str, session: str, bankroll: float) -> dict:
+    """
+    Exact final-bankroll distribution of a session, by dynamic programming.
+
+    The probability mass over bankroll values is propagated bet by bet with
+    the play_session rules (stop checks before each bet, skipped bets when
+    the bankroll is short, uniform quantity between min and max).
+
+    Args:
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        session: Name of the session
+        bankroll: Initial bankroll amount
+
+    Returns:
+        Dict with 'distribution' (final bankroll -> probability),
+        'stop-reasons' (reason -> probability), 'expected-bankroll',
+        'ruin-probability' (final bankroll <= 0) and 'expected-bets'
+    """
+    plan = get_session_plan(find_session_by_name(sessions_dir, session), games_dir)
+    outcomes, expected_bets = _propagate_session(plan, bankroll)
+
+    distribution = {}
+    stop_reasons = {}
+    for (b, reason), p in outcomes.items():
+        _add(distribution, b, p)
+        _add(stop_reasons, reason, p)
+
+    result = _summarize(distribution, expected_bets)
+    result['stop-reasons'] = stop_reasons
+    return result
+
+
+def solve_simulation(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str) -> dict:
+    """
+    Exact final-bankroll distribution of a whole simulation.
+
+    The distribution is chained over the action list, withdraws and aports
+    shifting it. A session is solved once and shifted for every starting
+    bankroll where it is translation invariant, and solved once per distinct
+    starting bankroll elsewhere.
+
+    Returns:
+        Dict with 'distribution', 'expected-bankroll', 'ruin-probability'
+        and 'expected-bets', as solve_session
+    """
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+
+    values = np.array([sim_config['start-bankroll']], dtype=np.float64)
+    probabilities = np.ones(1)
+    expected_bets = 0.0
+    solved = {}
+
+    for action in sim_config['actions']:
+        action_type = action['type']
+
+        if action_type == 'play':
+            plan = get_session_plan(find_session_by_name(sessions_dir, action['name']), games_dir)
+            floor = _translation_floor(plan)
+
+            parts_values = []
+            parts_probabilities = []
+
+            shifted = np.zeros(len(values), dtype=bool) if floor is None else values >= floor
+            if shifted.any():
+                key = (action['name'], None)
+                if key not in solved:
+                    outcomes, bets = _propagate_session(plan, 0.0, skip=False)
+                    deltas = _merge(np.array([b for b, reason in outcomes]), np.array(list(outcomes.values())))
+                    solved[key] = (deltas, bets)
+                (deltas, delta_probabilities), bets = solved[key]
+
+                expected_bets += probabilities[shifted].sum() * bets
+                parts_values.append((values[shifted][:, None] + deltas[None, :]).ravel())
+                parts_probabilities.append((probabilities[shifted][:, None] * delta_probabilities[None, :]).ravel())
+
+            for bankroll, p in zip(values[~shifted].tolist(), probabilities[~shifted].tolist()):
+                key = (action['name'], bankroll)
+                if key not in solved:
+                    solved[key] = _propagate_session(plan, bankroll)
+                outcomes, bets = solved[key]
+
+                expected_bets += p * bets
+                parts_values.append(np.array([b for b, reason in outcomes]))
+                parts_probabilities.append(p * np.array(list(outcomes.values())))
+
+            values, probabilities = _merge(np.concatenate(parts_values), np.concatenate(parts_probabilities))
+
+        elif action_type == 'withdraw':
+            values = np.round(values - action['size'], PRECISION)
+
+        elif action_type == 'aport':
+            values = np.round(values + action['size'], PRECISION)
+
+    return _summarize(dict(zip(values.tolist(), probabilities.tolist())), expected_bets)
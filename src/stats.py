@@ -0,0 +1,334 @@
+import math
+from .analysis import CurveBands
+
+# two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+def bankroll_curve(run: list) -> list:
+    """Returns the bankroll after each bet of a run (or after each action without bets)."""
+    curve = []
+    for action in run:
+        if action['type'] == 'play' and action['bets']:
+            for bet in action['bets']:
+                curve.append(bet['bankroll'])
+        else:
+            curve.append(action['bankroll'])
+    return curve
+
+
+class _Moments:
+    """Welford running mean/variance, mergeable with Chan's formula."""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other) -> None:
+        count = self.count + other.count
+        if not count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+class TailEstimator:
+    """
+    Likelihood-ratio weighted tail probabilities of the final bankroll.
+
+    Each run counts with its importance-sampling weight (1.0 for plain
+    runs), so P(final <= t) is the mean of weight * [final <= t] and its
+    standard error the one of those terms. With untilted runs this reduces
+    to the plain frequency.
+
+    Args:
+        lower: Thresholds t reported as P(final <= t)
+        upper: Thresholds t reported as P(final >= t)
+    """
+
+    def __init__(self, lower: tuple = (0.0,), upper: tuple = ()):
+        self.lower = tuple(lower)
+        self.upper = tuple(upper)
+        self.count = 0
+        self.weight_sum = 0.0
+        self.weight_squares = 0.0
+        self.value_sum = 0.0
+        self.value_squares = 0.0
+        self.lower_sums = [0.0] * len(self.lower)
+        self.lower_squares = [0.0] * len(self.lower)
+        self.upper_sums = [0.0] * len(self.upper)
+        self.upper_squares = [0.0] * len(self.upper)
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self.count += 1
+        self.weight_sum += weight
+        self.weight_squares += weight * weight
+        self.value_sum += weight * value
+        self.value_squares += (weight * value) ** 2
+
+        squared = weight * weight
+        for idx, threshold in enumerate(self.lower):
+            if value <= threshold:
+                self.lower_sums[idx] += weight
+                self.lower_squares[idx] += squared
+        for idx, threshold in enumerate(self.upper):
+            if value >= threshold:
+                self.upper_sums[idx] += weight
+                self.upper_squares[idx] += squared
+
+    def merge(self, other) -> None:
+        if (other.lower, other.upper) != (self.lower, self.upper):
+            raise ValueError("Cannot merge tail estimators with different thresholds")
+
+        self.count += other.count
+        self.weight_sum += other.weight_sum
+        self.weight_squares += other.weight_squares
+        self.value_sum += other.value_sum
+        self.value_squares += other.value_squares
+        self.lower_sums = [a + b for a, b in zip(self.lower_sums, other.lower_sums)]
+        self.lower_squares = [a + b for a, b in zip(self.lower_squares, other.lower_squares)]
+        self.upper_sums = [a + b for a, b in zip(self.upper_sums, other.upper_sums)]
+        self.upper_squares = [a + b for a, b in zip(self.upper_squares, other.upper_squares)]
+
+    def _estimate(self, total: float, squares: float) -> dict:
+        if not self.count:
+            return {'estimate': math.nan, 'se': math.nan, 'ci': (math.nan, math.nan)}
+
+        estimate = total / self.count
+        if self.count > 1:
+            variance = max(0.0, (squares - total * total / self.count) / (self.count - 1))
+            se = math.sqrt(variance / self.count)
+        else:
+            se = math.nan
+        return {'estimate': estimate, 'se': se, 'ci': (estimate - Z_95 * se, estimate + Z_95 * se)}
+
+    @property
+    def effective_runs(self) -> float:
+        """Kish effective sample size, (sum w)^2 / sum w^2."""
+        return self.weight_sum ** 2 / self.weight_squares if self.weight_squares else 0.0
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            Dict with 'runs', 'effective-runs', the weighted 'mean' final
+            bankroll and the 'lower' / 'upper' threshold -> probability,
+            each estimate a dict with 'estimate', 'se' and the 95% 'ci'
+        """
+        return {
+            'runs': self.count,
+            'effective-runs': self.effective_runs,
+            'mean': self._estimate(self.value_sum, self.value_squares),
+            'lower': {
+                threshold: self._estimate(total, squares)
+                for threshold, total, squares in zip(self.lower, self.lower_sums, self.lower_squares)
+            },
+            'upper': {
+                threshold: self._estimate(total, squares)
+                for threshold, total, squares in zip(self.upper, self.upper_sums, self.upper_squares)
+            },
+        }
+
+
+class BankrollAggregator:
+    """
+    Constant-memory summary of a stream of simulation runs.
+
+    Runs are fed one at a time with add() and never kept. Aggregators built
+    over different parts of a batch (e.g. in worker processes) combine with
+    merge(). Quantiles come from a fixed-bin histogram of the final bankroll
+    over [low, high]; values outside the range are counted in under/overflow
+    bins and quantiles falling there are clamped to the exact min/max.
+
+    Runs played with a Tilt carry a likelihood-ratio weight. Every statistic
+    but 'tails' describes the runs as sampled; 'tails' (a TailEstimator)
+    reweights them back to the untilted distribution.
+
+    Args:
+        start_bankroll: Starting bankroll of the simulation
+        low: Lower bound of the histogram (default 0)
+        high: Upper bound of the histogram (default 2 x start_bankroll)
+        bins: Number of histogram bins
+        lower_tails: Extra thresholds t reported as P(final <= t), besides ruin (0)
+        upper_tails: Thresholds t reported as P(final >= t)
+        band_stride: Also keep per-step quantile bands of the bankroll curve
+            ('bands', a CurveBands over [low, high]) every band_stride bets;
+            None disables them
+        band_bins: Histogram bins per band step
+    """
+
+    def __init__(self, start_bankroll: float, low: float = 0.0, high: float = None, bins: int = 1000,
+                 lower_tails: tuple = (), upper_tails: tuple = (), band_stride: int = None, band_bins: int = 200):
+        self.start_bankroll = start_bankroll
+        self.low = low
+        self.high = high if high is not None else 2 * start_bankroll
+        if self.high <= self.low:
+            raise ValueError("Histogram 'high' must be greater than 'low'")
+
+        self.final = _Moments()
+        self.drawdown = _Moments()
+        self.min = math.inf
+        self.max = -math.inf
+        self.lowest = math.inf
+        self.highest = -math.inf
+        self.max_drawdown = 0.0
+        self.bankrupt = 0
+        self.tails = TailEstimator((0.0,) + tuple(lower_tails), upper_tails)
+        self.bands = CurveBands(self.low, self.high, band_bins, band_stride) if band_stride is not None else None
+
+        self.curve_sums = []
+        self.curve_counts = []
+
+        self.histogram = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def runs(self) -> int:
+        return self.final.count
+
+    def add(self, run: list) -> None:
+        """Adds one play_simulation result (weighted when played with a tilt)."""
+        self.add_curve(bankroll_curve(run), run[-1].get('weight', 1.0) if run else 1.0)
+
+    def add_curve(self, curve: list, weight: float = 1.0) -> None:
+        """Adds one run given as its bankroll after each bet."""
+        final = curve[-1] if curve else self.start_bankroll
+        self._add_final(final)
+        self.tails.add(final, weight)
+        if self.bands is not None and curve:
+            self.bands.add_curve(curve)
+
+        peak = self.start_bankroll
+        drawdown = 0.0
+        lowest = self.start_bankroll
+        highest = self.start_bankroll
+
+        sums = self.curve_sums
+        counts = self.curve_counts
+        for step, bankroll in enumerate(curve):
+            if step == len(sums):
+                sums.append(0.0)
+                counts.append(0)
+            sums[step] += bankroll
+            counts[step] += 1
+
+            if bankroll > peak:
+                peak = bankroll
+            elif peak - bankroll > drawdown:
+                drawdown = peak - bankroll
+            if bankroll < lowest:
+                lowest = bankroll
+            if bankroll > highest:
+                highest = bankroll
+
+        self.drawdown.add(drawdown)
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        self.lowest = min(self.lowest, lowest)
+        self.highest = max(self.highest, highest)
+
+    def _add_final(self, final: float) -> None:
+        self.final.add(final)
+        self.min = min(self.min, final)
+        self.max = max(self.max, final)
+        if final <= 0:
+            self.bankrupt += 1
+
+        if final < self.low:
+            self.underflow += 1
+        elif final >= self.high:
+            self.overflow += 1
+        else:
+            bins = len(self.histogram)
+            self.histogram[int((final - self.low) / (self.high - self.low) * bins)] += 1
+
+    def merge(self, other) -> None:
+        """Adds the runs summarized by another aggregator with the same histogram."""
+        if (other.low, other.high, len(other.histogram)) != (self.low, self.high, len(self.histogram)):
+            raise ValueError("Cannot merge aggregators with different histograms")
+
+        self.final.merge(other.final)
+        self.drawdown.merge(other.drawdown)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.lowest = min(self.lowest, other.lowest)
+        self.highest = max(self.highest, other.highest)
+        self.max_drawdown = max(self.max_drawdown, other.max_drawdown)
+        self.bankrupt += other.bankrupt
+        self.tails.merge(other.tails)
+        if self.bands is not None and other.bands is not None:
+            self.bands.merge(other.bands)
+
+        for step, (total, count) in enumerate(zip(other.curve_sums, other.curve_counts)):
+            if step == len(self.curve_sums):
+                self.curve_sums.append(0.0)
+                self.curve_counts.append(0)
+            self.curve_sums[step] += total
+            self.curve_counts[step] += count
+
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1) of the final bankroll."""
+        if not self.runs:
+            return math.nan
+
+        target = q * self.runs
+        cumulative = self.underflow
+        if target <= cumulative:
+            return self.min
+
+        width = (self.high - self.low) / len(self.histogram)
+        for idx, count in enumerate(self.histogram):
+            if count and cumulative + count >= target:
+                value = self.low + (idx + (target - cumulative) / count) * width
+                return min(max(value, self.min), self.max)
+            cumulative += count
+        return self.max
+
+    def mean_curve(self) -> list:
+        """Mean bankroll per bet number, over the runs that reached that bet."""
+        return [total / count for total, count in zip(self.curve_sums, self.curve_counts)]
+
+    def to_dict(self, quantiles: tuple = (0.05, 0.25, 0.5, 0.75, 0.95), points: int = None) -> dict:
+        """
+        Args:
+            quantiles: Quantiles of the final bankroll (and of the bands)
+            points: Maximum number of steps of the bands (see CurveBands.to_dict)
+        """
+        summary = {
+            'runs': self.runs,
+            'start-bankroll': self.start_bankroll,
+            'mean': self.final.mean,
+            'std': math.sqrt(self.final.variance),
+            'min': self.min,
+            'max': self.max,
+            'lowest-bankroll': self.lowest,
+            'highest-bankroll': self.highest,
+            'bankrupt': self.bankrupt,
+            'bankrupt-rate': self.bankrupt / self.runs if self.runs else math.nan,
+            'mean-max-drawdown': self.drawdown.mean,
+            'max-drawdown': self.max_drawdown,
+            'quantiles': {q: self.quantile(q) for q in quantiles},
+            'mean-curve': self.mean_curve(),
+            'tails': self.tails.to_dict(),
+        }
+        if self.bands is not None:
+            summary['bands'] = self.bands.to_dict(quantiles, points)
+        return summary
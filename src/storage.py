@@ -0,0 +1,269 @@
+import json
+import struct
+import zipfile
+import numpy as np
+
+ACTION_TYPES = ('play', 'withdraw', 'aport')
+
+# dictionary-encoded columns: code -> string, -1 stands for None
+ENCODED_COLUMNS = ('action-name', 'game', 'bet-type', 'result')
+
+ACTION_COLUMNS = ('action-type', 'action-name', 'action-size', 'action-bankroll')
+BET_COLUMNS = ('game', 'bet-type', 'bet-size', 'result', 'payment', 'bankroll')
+
+_NPY_HEADERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+class _Dictionary:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+def encode_runs(runs: list) -> dict:
+    """
+    Converts play_simulation results into typed columns.
+
+    Actions of every run are stored back to back, and so are their bets;
+    'run-offsets' and 'bet-offsets' give the slice of each run and action.
+    String columns are dictionary-encoded into int16 codes.
+
+    Args:
+        runs: List of play_simulation results
+
+    Returns:
+        Dict of column name -> numpy array, plus 'dictionary', a json string
+        mapping each encoded column to its list of values
+    """
+    dictionaries = {column: _Dictionary() for column in ENCODED_COLUMNS}
+    encode_name = dictionaries['action-name'].encode
+    encode_game = dictionaries['game'].encode
+    encode_bet_type = dictionaries['bet-type'].encode
+    encode_result = dictionaries['result'].encode
+
+    run_offsets = [0]
+    bet_offsets = [0]
+    actions = {column: [] for column in ACTION_COLUMNS}
+    bets = {column: [] for column in BET_COLUMNS}
+
+    for run in runs:
+        for action in run:
+            actions['action-type'].append(ACTION_TYPES.index(action['type']))
+            actions['action-name'].append(encode_name(action.get('name')))
+            actions['action-size'].append(action.get('size', np.nan))
+            actions['action-bankroll'].append(action['bankroll'])
+
+            for bet in action.get('bets', ()):
+                bets['game'].append(encode_game(bet['game']))
+                bets['bet-type'].append(encode_bet_type(bet['bet-type']))
+                bets['bet-size'].append(bet['bet-size'])
+                bets['result'].append(encode_result(bet['result']))
+                bets['payment'].append(bet['payment'])
+                bets['bankroll'].append(bet['bankroll'])
+
+            bet_offsets.append(len(bets['game']))
+        run_offsets.append(len(actions['action-type']))
+
+    columns = {
+        'run-offsets': np.array(run_offsets, dtype=np.int64),
+        'bet-offsets': np.array(bet_offsets, dtype=np.int64),
+        'action-type': np.array(actions['action-type'], dtype=np.int8),
+        'action-name': np.array(actions['action-name'], dtype=np.int16),
+        'action-size': np.array(actions['action-size'], dtype=np.float64),
+        'action-bankroll': np.array(actions['action-bankroll'], dtype=np.float64),
+        'game': np.array(bets['game'], dtype=np.int16),
+        'bet-type': np.array(bets['bet-type'], dtype=np.int16),
+        'bet-size': np.array(bets['bet-size'], dtype=np.float64),
+        'result': np.array(bets['result'], dtype=np.int16),
+        'payment': np.array(bets['payment'], dtype=np.float64),
+        'bankroll': np.array(bets['bankroll'], dtype=np.float64),
+    }
+    columns['dictionary'] = np.array(json.dumps(
+        {column: dictionary.values for column, dictionary in dictionaries.items()}
+    ))
+    return columns
+
+
+def write_runs(file, runs: list) -> None:
+    """Writes play_simulation results as an uncompressed .npz of columns."""
+    np.savez(file, **encode_runs(runs))
+
+
+def _map_npz(path: str) -> dict:
+    """
+    Opens the columns of a .npz file without reading them.
+
+    np.load ignores mmap_mode for archives, but np.savez stores every member
+    uncompressed as a plain .npy file, so numeric members are memory-mapped
+    in place. Other members (the json dictionary) are read.
+    """
+    columns = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-len('.npy')]
+
+            if info.compress_type == zipfile.ZIP_STORED:
+                # local file header: 30 fixed bytes, then the name and extra field
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack('<HH', f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                read_header = _NPY_HEADERS.get(np.lib.format.read_magic(f))
+                if read_header is not None:
+                    shape, fortran_order, dtype = read_header(f)
+                    if dtype.kind in 'biuf':
+                        if 0 in shape:
+                            columns[name] = np.empty(shape, dtype=dtype)
+                        else:
+                            columns[name] = np.memmap(
+                                path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                order='F' if fortran_order else 'C',
+                            )
+                        continue
+
+            with archive.open(info) as member:
+                columns[name] = np.lib.format.read_array(member)
+    return columns
+
+
+class _Shard:
+    """Columns of one file, mapped, with its own dictionary and optionally only its first 'runs'."""
+
+    def __init__(self, columns: dict, runs: int = None):
+        self.columns = columns
+        self.dictionary = json.loads(str(columns['dictionary']))
+        self.runs = len(columns['run-offsets']) - 1
+        self.actions = len(columns['action-type'])
+        self.bets = len(columns['game'])
+        if runs is not None and runs < self.runs:
+            self.runs = runs
+            self.actions = int(columns['run-offsets'][runs])
+            self.bets = int(columns['bet-offsets'][self.actions])
+
+    def column(self, name: str) -> np.ndarray:
+        if name == 'run-offsets':
+            return self.columns[name][:self.runs + 1]
+        if name == 'bet-offsets':
+            return self.columns[name][:self.actions + 1]
+        if name in ACTION_COLUMNS:
+            return self.columns[name][:self.actions]
+        return self.columns[name][:self.bets]
+
+
+class RunStore:
+    """
+    Read access to simulation runs stored as columns.
+
+    Shards are memory-mapped when the store opens and only their small
+    dictionaries are read, so opening a large batch and rebuilding a few
+    runs touches just those runs. Whole columns are returned as arrays
+    without decoding anything (joined across shards when asked for); single
+    runs can be rebuilt in the play_simulation format with run(i).
+    """
+
+    def __init__(self, paths, runs: int = None):
+        if isinstance(paths, str):
+            paths = [paths]
+
+        self._shards = []
+        opened = 0
+        for path in paths:
+            if runs is not None and opened >= runs:
+                break
+            shard = _Shard(_map_npz(path), None if runs is None else runs - opened)
+            self._shards.append(shard)
+            opened += shard.runs
+        if not self._shards:
+            self._shards.append(_Shard(encode_runs([])))
+
+        # first run of every shard, and a final entry holding the run count
+        self._starts = np.cumsum([0] + [shard.runs for shard in self._shards])
+
+        # one dictionary for the whole store, and the code mapping of every shard into it
+        dictionaries = {column: _Dictionary() for column in ENCODED_COLUMNS}
+        self._mappings = []
+        for shard in self._shards:
+            self._mappings.append({
+                # the extra trailing entry keeps the -1 (None) code unchanged
+                column: np.array([dictionaries[column].encode(value) for value in shard.dictionary[column]] + [-1],
+                                 dtype=np.int16)
+                for column in ENCODED_COLUMNS
+            })
+        self.dictionary = {column: dictionary.values for column, dictionary in dictionaries.items()}
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a whole column; encoded columns hold codes into self.dictionary[name]."""
+        if name in ('run-offsets', 'bet-offsets'):
+            parts = [np.zeros(1, dtype=np.int64)]
+            for shard in self._shards:
+                parts.append(shard.column(name)[1:] + parts[-1][-1])
+            return np.concatenate(parts)
+
+        parts = []
+        for shard, mapping in zip(self._shards, self._mappings):
+            values = shard.column(name)
+            if name in ENCODED_COLUMNS:
+                values = mapping[name][values]
+            parts.append(values)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def run(self, index: int) -> list:
+        """Rebuilds run 'index' as the list of actions play_simulation returns."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Run {index} out of range for a store of {len(self)} runs")
+        shard_index = int(np.searchsorted(self._starts, index, side='right')) - 1
+        shard = self._shards[shard_index]
+        columns = shard.columns
+        dictionary = shard.dictionary
+        index -= int(self._starts[shard_index])
+
+        def decode(column, code):
+            return None if code < 0 else dictionary[column][code]
+
+        run = []
+        for action in range(columns['run-offsets'][index], columns['run-offsets'][index + 1]):
+            action_type = ACTION_TYPES[columns['action-type'][action]]
+            bankroll = float(columns['action-bankroll'][action])
+
+            if action_type != 'play':
+                run.append({'type': action_type, 'size': float(columns['action-size'][action]), 'bankroll': bankroll})
+                continue
+
+            bets = []
+            for bet in range(columns['bet-offsets'][action], columns['bet-offsets'][action + 1]):
+                bets.append({
+                    'game': decode('game', columns['game'][bet]),
+                    'bet-type': decode('bet-type', columns['bet-type'][bet]),
+                    'bet-size': float(columns['bet-size'][bet]),
+                    'result': decode('result', columns['result'][bet]),
+                    'payment': float(columns['payment'][bet]),
+                    'bankroll': float(columns['bankroll'][bet]),
+                })
+
+            run.append({
+                'type': 'play',
+                'name': decode('action-name', columns['action-name'][action]),
+                'bets': bets,
+                'bankroll': bankroll,
+            })
+        return run
+
+    def runs(self) -> list:
+        return [self.run(index) for index in range(len(self))]
@@ -0,0 +1,197 @@
+import copy
+import itertools
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from .finder import find_session_by_name, find_simulation_by_name
+from .schema_validator import validate_session_schema
+from .play import play_simulation, _play_session, STOP_REASONS, TRACE_NONE
+from .plan import get_session_plan
+from .rng import spawn_rng
+
+SESSION_KEYS = ('stop-loss-size', 'stop-win-size', 'stop-loss-percent', 'stop-gain-percent')
+BET_KEYS = ('bet-size', 'bet-percent', 'min-quantity', 'max-quantity')
+
+
+def session_variant(session_config: dict, overrides: dict) -> dict:
+    """
+    Returns a copy of a session with some parameters replaced.
+
+    Stop parameters apply to the session, bet parameters to every bet of it.
+    Setting 'bet-size' drops 'bet-percent' and the other way around, so a
+    variant cannot set both.
+
+    Raises:
+        ValueError: If a key cannot be swept, both bet sizings are set or the
+            variant is not a valid session (e.g. 'min-quantity' above 'max-quantity')
+    """
+    if 'bet-size' in overrides and 'bet-percent' in overrides:
+        raise ValueError("Cannot set both 'bet-size' and 'bet-percent', a bet uses only one of them")
+
+    variant = copy.deepcopy(session_config)
+
+    for key, value in overrides.items():
+        if key in SESSION_KEYS:
+            variant[key] = value
+        elif key in BET_KEYS:
+            for bet in variant['bets']:
+                bet[key] = value
+                if key == 'bet-size':
+                    bet.pop('bet-percent', None)
+                elif key == 'bet-percent':
+                    bet.pop('bet-size', None)
+        else:
+            raise ValueError(f"Cannot sweep '{key}', expected one of {SESSION_KEYS + BET_KEYS}")
+
+    validate_session_schema(variant)
+    return variant
+
+
+def _quantities_ordered(session_config: dict, cell: dict) -> bool:
+    """Whether every bet keeps min-quantity <= max-quantity once the cell is applied."""
+    for bet in session_config['bets']:
+        min_quantity = cell.get('min-quantity', bet.get('min-quantity', 1))
+        if min_quantity > cell.get('max-quantity', bet.get('max-quantity', min_quantity)):
+            return False
+    return True
+
+
+def _grid_cells(grid: dict, session_config: dict) -> list:
+    """
+    Every combination of the grid values, skipping the ones that leave a bet
+    of the session with min-quantity > max-quantity.
+
+    Raises:
+        ValueError: If the grid sweeps both 'bet-size' and 'bet-percent'
+    """
+    if 'bet-size' in grid and 'bet-percent' in grid:
+        raise ValueError("Cannot sweep both 'bet-size' and 'bet-percent', a bet uses only one of them")
+
+    keys = list(grid)
+    cells = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        cell = dict(zip(keys, values))
+        if _quantities_ordered(session_config, cell):
+            cells.append(cell)
+    return cells
+
+
+def _quantile(ordered: list, q: float) -> float:
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def run_cell(task: tuple) -> dict:
+    """Plays one grid point of a sweep (see sweep_tasks) and returns its row."""
+    kind, dirs, name, cell, variant, start_bankroll, runs, seed = task
+    simulations_dir, sessions_dir, games_dir = dirs
+
+    finals = []
+    bets = 0
+    stop_reasons = dict.fromkeys(STOP_REASONS, 0)
+    if kind == 'session':
+        plan = get_session_plan(variant, games_dir)
+    else:
+        sessions = {variant['name']: variant}
+
+    for i in range(runs):
+        # run i draws from the same substream in every cell (common random numbers)
+        rng = spawn_rng(seed, i)
+        if kind == 'session':
+            bankroll, _, played, stop_reason, _ = _play_session(plan, start_bankroll, rng, None)
+        else:
+            summary = play_simulation(
+                simulations_dir, sessions_dir, games_dir, name, rng, TRACE_NONE, sessions
+            )
+            bankroll, played, stop_reason = summary['bankroll'], summary['bets'], summary['stop-reason']
+        finals.append(bankroll)
+        bets += played
+        stop_reasons[stop_reason] += 1
+
+    profits = sorted(final - start_bankroll for final in finals)
+    row = dict(cell)
+    row.update({
+        'runs': runs,
+        'ruin-rate': sum(1 for final in finals if final <= 0) / runs,
+        'mean-profit': statistics.fmean(profits),
+        'profit-p05': _quantile(profits, 0.05),
+        'profit-p50': _quantile(profits, 0.50),
+        'profit-p95': _quantile(profits, 0.95),
+        'mean-bets': bets / runs,
+    })
+    if kind == 'session':
+        for reason, count in stop_reasons.items():
+            row[f'{reason}-rate'] = count / runs
+    return row
+
+
+def sweep_tasks(simulations_dir: str, sessions_dir: str, games_dir: str, session: str, grid: dict, runs: int,
+                seed, simulation: str = None, bankroll: float = None) -> list:
+    """
+    One run_cell task per grid point, in grid order. Points that leave a
+    bet with 'min-quantity' above 'max-quantity' are skipped.
+
+    Without 'simulation' the cells play 'session' from 'bankroll'; with it,
+    they play the simulation from its start bankroll with 'session' replaced
+    by the variant.
+
+    Raises:
+        ValueError: If a configuration is unknown, the simulation never
+            plays 'session', the grid sweeps both 'bet-size' and
+            'bet-percent' or a grid point is not a valid variant
+    """
+    session_config = find_session_by_name(sessions_dir, session)
+    if simulation is None:
+        kind, name, start_bankroll = 'session', session, bankroll
+    else:
+        sim_config = find_simulation_by_name(simulations_dir, simulation)
+        if not any(action['type'] == 'play' and action['name'] == session for action in sim_config['actions']):
+            raise ValueError(f"Simulation '{simulation}' does not play session '{session}'")
+        kind, name, start_bankroll = 'simulation', simulation, sim_config['start-bankroll']
+
+    dirs = (simulations_dir, sessions_dir, games_dir)
+    return [
+        (kind, dirs, name, cell, session_variant(session_config, cell), start_bankroll, runs, seed)
+        for cell in _grid_cells(grid, session_config)
+    ]
+
+
+def _sweep(tasks: list, workers: int) -> list:
+    if workers == 1:
+        return [run_cell(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_cell, tasks))
+
+
+def sweep_session(sessions_dir: str, games_dir: str, session: str, bankroll: float, grid: dict,
+                  runs: int, seed=0, workers: int = None) -> list:
+    """
+    Plays every grid variant of a session 'runs' times.
+
+    Args:
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        session: Name of the session to vary
+        bankroll: Initial bankroll of every session
+        grid: Parameter -> list of values, for any of SESSION_KEYS and BET_KEYS
+        runs: Runs per grid point; run i uses spawn_rng(seed, i) in every
+            cell, so cells are compared on common random numbers
+        seed: Sweep seed
+        workers: Number of worker processes (None uses every core, 1 runs inline)
+
+    Returns:
+        One row per grid point (see sweep_tasks): its parameters, 'runs', 'ruin-rate',
+        'mean-profit', 'profit-p05'/'p50'/'p95', 'mean-bets' and the rate of
+        each stop reason
+    """
+    return _sweep(sweep_tasks(None, sessions_dir, games_dir, session, grid, runs, seed, bankroll=bankroll), workers)
+
+
+def sweep_simulation(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, session: str,
+                     grid: dict, runs: int, seed=0, workers: int = None) -> list:
+    """
+    Plays a simulation once per grid variant of one of its sessions.
+
+    Every 'play' action of 'session' uses the variant. Arguments and rows
+    are those of sweep_session, without the stop reason rates. Raises
+    ValueError when the simulation never plays 'session'.
+    """
+    return _sweep(sweep_tasks(simulations_dir, sessions_dir, games_dir, session, grid, runs, seed, simulation), workers)
@@ -0,0 +1,121 @@
+import math
+import numpy as np
+from .finder import find_session_by_name
+from .schema_validator import validate_session_schema
+from .play import _play_session
+from .plan import get_session_plan
+from .rng import spawn_rng, antithetic_rng
+from .stats import Z_95
+
+
+def mean_estimate(values, sampling: str = 'plain') -> dict:
+    """
+    Mean of per-run values with its standard error.
+
+    With 'antithetic' sampling, run i and run i + n/2 form a pair and the
+    error comes from the spread of the pair means. Otherwise the iid
+    formula is used, which does not credit stratified sampling for its
+    lower variance (the reported error is conservative there).
+
+    Returns:
+        Dict with 'estimate', 'se' and the 95% 'ci' (low, high)
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if sampling == 'antithetic':
+        half = values.size // 2
+        values = (values[:half] + values[half:2 * half]) / 2
+
+    estimate = float(values.mean()) if values.size else math.nan
+    se = float(values.std(ddof=1) / math.sqrt(values.size)) if values.size > 1 else math.nan
+    return {'estimate': estimate, 'se': se, 'ci': (estimate - Z_95 * se, estimate + Z_95 * se)}
+
+
+def summarize_batch(batch: dict, start_bankroll: float, sampling: str = 'plain') -> dict:
+    """
+    Statistics of a play_session_batch / play_simulation_batch result, each
+    with its standard error (see mean_estimate).
+
+    Returns:
+        Dict of statistic -> mean_estimate dict: 'mean-bankroll',
+        'mean-profit', 'ruin-probability' (final bankroll <= 0),
+        'profit-probability' (final bankroll above the start), 'mean-bets'
+        and 'mean-min-bankroll'
+    """
+    final = batch['bankroll']
+    return {
+        'mean-bankroll': mean_estimate(final, sampling),
+        'mean-profit': mean_estimate(final - start_bankroll, sampling),
+        'ruin-probability': mean_estimate(final <= 0, sampling),
+        'profit-probability': mean_estimate(final > start_bankroll, sampling),
+        'mean-bets': mean_estimate(batch['bets'], sampling),
+        'mean-min-bankroll': mean_estimate(batch['min-bankroll'], sampling),
+    }
+
+
+def _resolve_session(sessions_dir: str, session) -> dict:
+    if isinstance(session, dict):
+        validate_session_schema(session)
+        return session
+    return find_session_by_name(sessions_dir, session)
+
+
+def compare_sessions(sessions_dir: str, games_dir: str, session_a, session_b, bankroll: float, runs: int,
+                     seed=0, antithetic: bool = False) -> dict:
+    """
+    Compares two session configurations on common random numbers.
+
+    Run i of both sessions draws from the same substream, so the noise
+    shared by the two configurations cancels in their difference. With
+    antithetic, the second half of the runs replays the first half's
+    substreams mirrored (see AntitheticRandom).
+
+    Args:
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        session_a, session_b: Session names or configuration dicts
+        bankroll: Initial bankroll of every session
+        runs: Runs per session (even when antithetic)
+        seed: Comparison seed
+        antithetic: Pair each substream with its mirror image
+
+    Returns:
+        Dict of statistic ('mean-profit', 'ruin-probability', 'mean-bets')
+        -> {'a', 'b', 'difference'}, each a mean_estimate dict; 'difference'
+        is b minus a with its paired standard error
+    """
+    if antithetic and runs % 2:
+        raise ValueError("Antithetic sampling needs an even number of runs")
+
+    configs = (_resolve_session(sessions_dir, session_a), _resolve_session(sessions_dir, session_b))
+    sampling = 'antithetic' if antithetic else 'plain'
+
+    if antithetic:
+        streams = [spawn_rng] * (runs // 2) + [antithetic_rng] * (runs // 2)
+        indexes = list(range(runs // 2)) * 2
+    else:
+        streams = [spawn_rng] * runs
+        indexes = list(range(runs))
+
+    samples = []
+    for config in configs:
+        plan = get_session_plan(config, games_dir)
+        profits = np.empty(runs)
+        bets = np.empty(runs)
+        for run, (stream, index) in enumerate(zip(streams, indexes)):
+            final, _, played, _, _ = _play_session(plan, bankroll, stream(seed, index), None)
+            profits[run] = final - bankroll
+            bets[run] = played
+        samples.append({'mean-profit': profits, 'ruin-probability': profits <= -bankroll, 'mean-bets': bets})
+
+    a, b = samples
+    return {
+        statistic: {
+            'a': mean_estimate(a[statistic], sampling),
+            'b': mean_estimate(b[statistic], sampling),
+            'difference': mean_estimate(
+                b[statistic].astype(np.float64) - a[statistic].astype(np.float64), sampling
+            ),
+        }
+        for statistic in a
+    }
@@ -0,0 +1,214 @@
+import numpy as np
+from .finder import find_session_by_name, find_simulation_by_name
+from .plan import get_session_plan
+from .rng import make_generator
+from .play import STOP_REASONS
+
+STOP_COMPLETED = STOP_REASONS.index('completed')
+STOP_LOSS = STOP_REASONS.index('stop-loss')
+STOP_WIN = STOP_REASONS.index('stop-win')
+
+# How the uniforms of a batch are drawn: independently, in antithetic pairs
+# (run i and run i + runs/2 see u and 1 - u), or stratified across runs (each
+# bet column holds exactly one draw in every [k/runs, (k+1)/runs) stratum).
+SAMPLING_MODES = ('plain', 'antithetic', 'stratified')
+
+
+def _check_sampling(sampling: str, runs: int) -> None:
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling '{sampling}', expected one of {SAMPLING_MODES}")
+    if sampling == 'antithetic' and runs % 2:
+        raise ValueError("Antithetic sampling needs an even number of runs")
+
+
+def _uniforms(generator, sampling: str, paths: np.ndarray, runs: int, columns: int) -> np.ndarray:
+    """Uniform draws of one bet group, one row per active path."""
+    if sampling == 'plain':
+        return generator.random((paths.size, columns))
+
+    if sampling == 'antithetic':
+        draws = generator.random((runs // 2, columns))
+        return np.concatenate([draws, 1 - draws])[paths]
+
+    strata = generator.permuted(np.tile(np.arange(runs), (columns, 1)), axis=1).T
+    return ((strata + generator.random((runs, columns))) / runs)[paths]
+
+
+def _quantities(generator, sampling: str, paths: np.ndarray, runs: int, low: int, high: int) -> np.ndarray:
+    if sampling == 'antithetic':
+        draws = generator.integers(low, high + 1, size=runs // 2)
+        return np.concatenate([draws, low + high - draws])[paths]
+    return generator.integers(low, high + 1, size=paths.size)
+
+
+def _play_session_batch(plan, bankroll: np.ndarray, generator, sampling: str = 'plain') -> tuple:
+    """
+    Plays one session plan on every path of 'bankroll' at once.
+
+    Per bet group, all outcomes are drawn in one (paths x max-quantity)
+    matrix, the bankroll before each bet is accumulated column by column
+    across all paths, and the first bet where the scalar loop would stop or
+    skip is found with an argmax over the halt mask. The bet size is fixed
+    within a group, so a 'bet-percent' group only needs one size per path,
+    taken from the bankroll of the path when the group starts.
+
+    Returns:
+        (bankroll, min_bankroll, bets, stop_reason) arrays, one entry per path
+    """
+    runs = bankroll.shape[0]
+    bankroll = bankroll.astype(np.float64, copy=True)
+    min_bankroll = bankroll.copy()
+    bets = np.zeros(runs, dtype=np.int64)
+    stop_reason = np.full(runs, STOP_COMPLETED, dtype=np.int8)
+    active = np.ones(runs, dtype=bool)
+
+    loss_threshold, win_threshold = plan.thresholds(bankroll, np.maximum, np.minimum)
+    loss_threshold = np.broadcast_to(loss_threshold, bankroll.shape)
+    win_threshold = np.broadcast_to(win_threshold, bankroll.shape)
+
+    for bet_plan in plan.bets:
+        paths = np.flatnonzero(active)
+        if paths.size == 0:
+            break
+
+        sampler = bet_plan.sampler
+        cumulative = np.asarray(sampler.cumulative)
+        multipliers = np.asarray(sampler.multipliers, dtype=np.float64)
+
+        if bet_plan.percent is None:
+            bet_size = np.full(paths.size, float(bet_plan.size))
+        else:
+            bet_size = bankroll[paths] * bet_plan.percent
+        min_quantity = bet_plan.min_quantity
+        max_quantity = bet_plan.max_quantity
+
+        quantity = _quantities(generator, sampling, paths, runs, min_quantity, max_quantity)
+        uniforms = _uniforms(generator, sampling, paths, runs, max_quantity)
+        outcomes = np.searchsorted(cumulative, uniforms, side='left')
+
+        # bankroll before bet k, one column per bet; each step rounds as the
+        # scalar loop does, (bankroll - bet) + payment, so bankrolls landing
+        # exactly on a stop threshold stop in both engines
+        payments = bet_size[:, None] * multipliers[outcomes]
+        before = np.empty((paths.size, max_quantity + 1))
+        before[:, 0] = bankroll[paths]
+        for k in range(max_quantity):
+            np.subtract(before[:, k], bet_size, out=before[:, k + 1])
+            before[:, k + 1] += payments[:, k]
+
+        in_range = np.arange(max_quantity + 1) < quantity[:, None]
+        path_loss = loss_threshold[paths, None]
+        path_win = win_threshold[paths, None]
+        hits_loss = before <= path_loss
+        hits_win = before >= path_win
+        halts = in_range & (hits_loss | hits_win | (before < bet_size[:, None]))
+
+        halted = halts.any(axis=1)
+        played = np.where(halted, halts.argmax(axis=1), quantity)
+        rows = np.arange(paths.size)
+        final = before[rows, played]
+
+        reached = np.arange(max_quantity + 1) <= played[:, None]
+        lowest = np.where(reached, before, np.inf).min(axis=1)
+
+        reason = np.full(paths.size, STOP_COMPLETED, dtype=np.int8)
+        reason[halted & hits_win[rows, played]] = STOP_WIN
+        reason[halted & hits_loss[rows, played]] = STOP_LOSS
+
+        bankroll[paths] = final
+        min_bankroll[paths] = np.minimum(min_bankroll[paths], lowest)
+        bets[paths] += played
+        stop_reason[paths] = reason
+        active[paths[reason != STOP_COMPLETED]] = False
+
+    return bankroll, min_bankroll, bets, stop_reason
+
+
+def play_session_batch(sessions_dir: str, games_dir: str, session: str, bankroll: float, runs: int, rng=None,
+                       sampling: str = 'plain') -> dict:
+    """
+    Plays 'runs' independent copies of a session as arrays.
+
+    Follows the play_session semantics: stop conditions are checked before
+    each bet against the session's initial bankroll, bets larger than the
+    bankroll are skipped, and 'bet-percent' sizes are taken from the
+    bankroll when their bet group starts.
+
+    Args:
+        sessions_dir: Directory containing session configurations
+        games_dir: Directory containing game configurations
+        session: Name of the session to play
+        bankroll: Initial bankroll amount
+        runs: Number of independent sessions
+        rng: Optional seed or numpy Generator (see make_generator)
+        sampling: One of SAMPLING_MODES
+
+    Returns:
+        Dict of arrays with one entry per run: 'bankroll', 'min-bankroll',
+        'bets' and 'stop-reason' (index into STOP_REASONS)
+    """
+    _check_sampling(sampling, runs)
+    plan = get_session_plan(find_session_by_name(sessions_dir, session), games_dir)
+    generator = make_generator(rng)
+
+    final, min_bankroll, bets, stop_reason = _play_session_batch(
+        plan, np.full(runs, bankroll, dtype=np.float64), generator, sampling
+    )
+    return {
+        'bankroll': final,
+        'min-bankroll': min_bankroll,
+        'bets': bets,
+        'stop-reason': stop_reason,
+    }
+
+
+def play_simulation_batch(simulations_dir: str, sessions_dir: str, games_dir: str, simulation: str, runs: int, rng=None,
+                          sampling: str = 'plain') -> dict:
+    """
+    Plays 'runs' independent copies of a simulation as arrays.
+
+    The action schedule is applied to every path at once, as in
+    play_simulation: 'play' runs a session on the paths' current bankroll,
+    'withdraw' and 'aport' subtract or add their size (a withdrawal also
+    counts towards the minimum bankroll). 'sampling' is one of
+    SAMPLING_MODES, as in play_session_batch.
+
+    Returns:
+        Dict of arrays: 'bankroll', 'min-bankroll' and 'bets' with one entry
+        per run, and 'stop-reasons' with one row per run and one column per
+        played session
+    """
+    _check_sampling(sampling, runs)
+    sim_config = find_simulation_by_name(simulations_dir, simulation)
+    generator = make_generator(rng)
+
+    bankroll = np.full(runs, sim_config['start-bankroll'], dtype=np.float64)
+    min_bankroll = bankroll.copy()
+    bets = np.zeros(runs, dtype=np.int64)
+    stop_reasons = []
+
+    for action in sim_config['actions']:
+        if action['type'] == 'withdraw':
+            bankroll -= action['size']
+            np.minimum(min_bankroll, bankroll, out=min_bankroll)
+            continue
+        if action['type'] == 'aport':
+            bankroll += action['size']
+            continue
+        if action['type'] != 'play':
+            continue
+
+        plan = get_session_plan(find_session_by_name(sessions_dir, action['name']), games_dir)
+        bankroll, session_min, session_bets, stop_reason = _play_session_batch(
+            plan, bankroll, generator, sampling
+        )
+        np.minimum(min_bankroll, session_min, out=min_bankroll)
+        bets += session_bets
+        stop_reasons.append(stop_reason)
+
+    return {
+        'bankroll': bankroll,
+        'min-bankroll': min_bankroll,
+        'bets': bets,
+        'stop-reasons': np.stack(stop_reasons, axis=1) if stop_reasons else np.zeros((runs, 0), dtype=np.int8),
+    }